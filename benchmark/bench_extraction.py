@@ -0,0 +1,55 @@
+"""
+Micro-benchmark of SimpleExtractor.perform_extraction on the bundled example page.
+
+Compare the items/sec of the compiled extraction plan against the previous behaviour
+of passing raw selector strings to element.select() for every parent and every field.
+
+    python benchmark/bench_extraction.py [repeat]
+"""
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+PAGE = os.path.join(HERE, "..", "doc", "code_example", "Modified quotes to scrape.html")
+
+from scraple.extract import Rules, SimpleExtractor  # noqa: E402
+
+
+def raw_selector_extraction(soup, rule):
+    for item in soup.select(rule.parent):
+        extracted = {}
+        for key in rule.fields:
+            selector_ = rule.fields[key][0]
+            child = item.select(selector_) if selector_ != "" else [item]
+            extracted[key] = child if rule.fields[key][1] is None else rule.fields[key][1](child)
+        yield extracted
+
+
+def items_per_sec(run, repeat):
+    count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        count += sum(1 for _ in run())
+    return count / (time.perf_counter() - start)
+
+
+def main(repeat=2000):
+    rules = Rules(PAGE, "local")
+    rules.add_field_rule("Einstein", "Author", pipeline="text")
+    rules.add_field_rule("change", "Tags", find_string_of_nth=2, pipeline="tags")
+    rules.add_field_rule("It cannot be changed", "Quote", pipeline="text")
+    soup = rules.get_reference_soup()
+    rule = rules.get_extract_rule()
+    extractor = SimpleExtractor(rule)
+
+    before = items_per_sec(lambda: raw_selector_extraction(soup, rule), repeat)
+    after = items_per_sec(lambda: extractor.perform_extraction(soup, "parsed"), repeat)
+    print(f"raw selector  : {before:10.0f} items/sec")
+    print(f"compiled plan : {after:10.0f} items/sec")
+    print(f"speedup       : {after / before:10.2f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
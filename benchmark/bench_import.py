@@ -0,0 +1,73 @@
+"""
+Benchmark of the import time of scraple, as paid by every short-lived process.
+
+Every case is timed in a fresh interpreter: importing the package alone, importing it and
+accessing Rules (which import beautifulsoup and the extraction modules), and importing
+beautifulsoup alone as a reference. The best and median of the runs are emitted as JSON.
+
+    python benchmark/bench_import.py [--repeat N] [--output result.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+
+CASES = [
+    ("import scraple", "import scraple"),
+    ("scraple.Rules", "import scraple; scraple.Rules"),
+    ("import bs4", "import bs4"),
+]
+TIMER = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, len(sys.modules), 'bs4' in sys.modules)
+"""
+
+
+def run_once(statement):
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.run([sys.executable, "-c", TIMER.format(statement=statement)], env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), int(output[1]), output[2] == "True"
+
+
+def run_case(name, statement, repeat):
+    runs = [run_once(statement) for _ in range(repeat)]
+    times = [elapsed for elapsed, _, _ in runs]
+    return {
+        "name": name,
+        "statement": statement,
+        "best_ms": min(times) * 1000,
+        "median_ms": statistics.median(times) * 1000,
+        "modules_loaded": runs[-1][1],
+        "bs4_loaded": runs[-1][2],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10, help="number of fresh interpreter per case")
+    parser.add_argument("--output", help="write the JSON to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = json.dumps({
+        "python": platform.python_version(),
+        "cases": [run_case(name, statement, max(1, args.repeat)) for name, statement in CASES],
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
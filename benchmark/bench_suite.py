@@ -0,0 +1,128 @@
+"""
+Benchmark suite of Rules construction, selector search and extraction throughput.
+
+Every case is a page, either synthetic (see synthetic.py) or the bundled quotes page, and
+for every case it measure the time of parsing, create_Tree, search_string per field,
+get_extract_rule, the items/sec of perform_extraction and the peak memory of building the
+rule and of extracting. The result is emitted as JSON so it can be compared across commits.
+
+    python benchmark/bench_suite.py [--quick] [--repeat N] [--output result.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+PAGE = os.path.join(HERE, "..", "doc", "code_example", "Modified quotes to scrape.html")
+
+import bs4  # noqa: E402
+
+from scraple.TreeCore import create_Tree  # noqa: E402
+from scraple.Tree_search_engine import search_string  # noqa: E402
+from scraple.extract import Rules, SimpleExtractor, refine_body  # noqa: E402
+from synthetic import synthetic_page, field_strings  # noqa: E402
+
+QUOTES_FIELDS = [("Einstein", 1), ("change", 2), ("It cannot be changed", 1)]
+CASES = [
+    {"name": "small", "items": 100, "depth": 4, "fields": 5, "padding": 20},
+    {"name": "deep", "items": 500, "depth": 40, "fields": 5, "padding": 20},
+    {"name": "wide", "items": 5000, "depth": 4, "fields": 10, "padding": 20},
+    {"name": "large", "items": 10000, "depth": 8, "fields": 5, "padding": 200},
+]
+QUICK_CASES = CASES[:2]
+
+
+def timed(function, repeat=1):
+    """Return the result of the last call and the best time of the calls."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def define_rules(html, fields):
+    rules = Rules(html, "html")
+    for number, (string, nth) in enumerate(fields):
+        rules.add_field_rule(string, f"field {number}", find_string_of_nth=nth, pipeline="text")
+    return rules
+
+
+def run_case(name, html, fields, repeat):
+    body, parse_time = timed(lambda: refine_body(html, "html"), repeat)
+    tree, tree_time = timed(lambda: create_Tree(body), repeat)
+    search_times = [timed(lambda: search_string(tree, string, nth), repeat)[1] for string, nth in fields]
+    rules = define_rules(html, fields)
+    _, rule_time = timed(rules.get_extract_rule, repeat)
+    extractor = SimpleExtractor(rules)
+    items, extract_time = timed(lambda: sum(1 for _ in extractor.perform_extraction(body, "parsed")), repeat)
+    return {
+        "name": name,
+        "page_bytes": len(html.encode("utf8")),
+        "elements": len(tree),
+        "fields": len(fields),
+        "items": items,
+        "parse_sec": parse_time,
+        "create_tree_sec": tree_time,
+        "search_string_sec_per_field": sum(search_times) / len(search_times),
+        "get_extract_rule_sec": rule_time,
+        "extraction_items_per_sec": items / extract_time if extract_time > 0 else None,
+        "rules_peak_bytes": peak_memory(lambda: define_rules(html, fields)),
+        "extraction_peak_bytes": peak_memory(lambda: list(extractor.perform_extraction(html, "html"))),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true", help="only run the small cases")
+    parser.add_argument("--repeat", type=int, default=3, help="number of run, the best time is kept")
+    parser.add_argument("--output", help="write the JSON to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    with open(PAGE, encoding="utf8") as file:
+        results.append(run_case("quotes", file.read(), QUOTES_FIELDS, args.repeat))
+    for case in QUICK_CASES if args.quick else CASES:
+        html = synthetic_page(case["items"], case["depth"], case["fields"], case["padding"])
+        fields = [(string, 1) for string in field_strings(case["items"], case["fields"])]
+        results.append(dict(run_case(case["name"], html, fields, args.repeat), parameters=case))
+
+    report = json.dumps({
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "beautifulsoup4": bs4.__version__,
+        "cases": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Generate synthetic listing pages of controlled size for the benchmarks.
+
+A page is a listing of `items` repeated item elements, each nested `depth` level below
+the body and holding `fields` leaf elements with unique text, plus `padding` characters of
+text per field to control the size of the page.
+"""
+
+
+def item_html(index, fields, padding):
+    leaves = "".join(
+        f'<span class="f{field}">field {field} item {index} {"x" * padding}</span>'
+        for field in range(fields)
+    )
+    return f'<div class="item">{leaves}</div>'
+
+
+def synthetic_page(items=1000, depth=8, fields=5, padding=20):
+    opening = "".join(f'<div class="level{level}">' for level in range(depth))
+    closing = "</div>" * depth
+    body = "\n".join(item_html(index, fields, padding) for index in range(items))
+    return f"<html><head><title>synthetic</title></head><body>{opening}{body}{closing}</body></html>"
+
+
+def field_strings(items=1000, fields=5):
+    """Strings that locate every field of the item in the middle of the page."""
+    index = items // 2
+    return [f"field {field} item {index} " for field in range(fields)]
@@ -156,7 +156,7 @@ print(nav_selector)
 # >>> div.container div.row div.col-md-8 nav ul.pager li.next a
 
 scrap_page = rules.get_reference_soup()
-next_link_dict = next(SimpleExtractor(navigation_rules).perform_extraction(scrap_page, "parsed"))
+next_link_dict = SimpleExtractor(navigation_rules).first(scrap_page, "parsed")
 print(next_link_dict["Navigation"])
 # >>> https://quotes.toscrape.com/page/2/
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1,29 +1,184 @@
 """
 Contain the core function of implementation for "custom tree structure"
 used in this package.
+
+The tree is a flat table of the elements in preorder. An element is referred either by its
+index in the table or by its identity, a tuple of its position among its sibling elements
+(start from 1) from the top most element down to it, e.g. (1, 3, 2).
 """
+from array import array
+
+
+class Tree:
+    """
+    Array backed table of every element of a body, in preorder.
+
+    Beside the structure (parent, sibling ordinal and selector node), the tree also hold
+    the flattened text of the body, the text of an element is the slice
+    ``document[start[i]:end[i]]`` which is equal to ``element.text``.
+    """
+    def __init__(self):
+        self.elements = []
+        self.parent = array('l')  # index of the parent element, -1 for the body
+        self.ordinal = array('l')  # position of the element among its sibling elements, start from 1
+        self.node = []  # interned "tag.class#id" of the element
+        self.start = array('l')
+        self.end = array('l')
+        self.special = bytearray()  # element which .text does not follow the main content strings (script, style, ...)
+        self.document = ""
+        self._child_offset = array('l')  # children of element i are _children[_child_offset[i + 1]:_child_offset[i + 2]]
+        self._children = array('l')
+
+    def __len__(self):
+        return len(self.elements)
 
+    def text(self, idx):
+        if self.special[idx]:
+            return self.elements[idx].text
+        return self.document[self.start[idx]:self.end[idx]]
 
-def appender(num, list_):
-    if num != 1:
-        list_[-1] = num
-    else:
-        list_.append(num)
+    def identity(self, idx):
+        identity = []
+        while idx != -1:
+            identity.append(self.ordinal[idx])
+            idx = self.parent[idx]
+        return tuple(reversed(identity))
 
+    def find(self, identity):
+        """Return the index of the element of the identity, raise KeyError if there is none."""
+        idx = -1
+        for ordinal in identity:
+            offset = self._child_offset[idx + 1] + ordinal - 1
+            if ordinal < 1 or offset >= self._child_offset[idx + 2]:
+                raise KeyError(identity)
+            idx = self._children[offset]
+        return idx
 
-def create_Tree(body, dictionary_tree=None, id_f=None, first_caller=True):
-    if first_caller:
-        dictionary_tree, id_f = {}, []
-    count = 1
-    for element in body:
-        if element.name is not None:
+    def children(self, idx):
+        """Return the indexes of the child elements of the element of the index, -1 for the body."""
+        return self._children[self._child_offset[idx + 1]:self._child_offset[idx + 2]]
+
+    def branch(self, idx, stop=-1):
+        """
+        Return the list of node from the top most element (or from below the ancestor of
+        index stop) down to the element of the index.
+        """
+        branch = []
+        while idx != stop:
+            branch.append(self.node[idx])
+            idx = self.parent[idx]
+        branch.reverse()
+        return branch
+
+
+def create_Tree(body):
+    tree = Tree()
+    main_types = _main_string_types(body)
+    interned = {}
+    strings, offset = [], 0
+    stack, counts = [(iter(body.children), -1)], [0]
+    while stack:
+        children, parent = stack[-1]
+        for element in children:
+            if element.name is None:
+                if type(element) in main_types:
+                    strings.append(element)
+                    offset += len(element)
+                continue
+            counts[-1] += 1
             node = node_constructor(element)
-            appender(count, id_f)
-            dictionary_tree[tuple(id_f)] = node
-            create_Tree(element, dictionary_tree, id_f.copy(), False)
-            count += 1
-    if first_caller:
-        return dictionary_tree
+            interesting = getattr(element, 'interesting_string_types', None)
+            tree.elements.append(element)
+            tree.parent.append(parent)
+            tree.ordinal.append(counts[-1])
+            tree.node.append(interned.setdefault(node, node))
+            tree.start.append(offset)
+            tree.end.append(offset)
+            tree.special.append(interesting is not None and set(interesting) != main_types)
+            stack.append((iter(element.children), len(tree.elements) - 1))
+            counts.append(0)
+            break
+        else:
+            stack.pop()
+            counts.pop()
+            if parent != -1:
+                tree.end[parent] = offset
+    tree.document = "".join(strings)
+    _link_children(tree)
+    return tree
+
+
+def _link_children(tree):
+    offsets = array('l', [0]) * (len(tree) + 2)
+    for parent in tree.parent:
+        offsets[parent + 2] += 1
+    for i in range(2, len(offsets)):
+        offsets[i] += offsets[i - 1]
+    children = array('l', [0]) * len(tree)
+    filled = offsets[:]
+    for idx, parent in enumerate(tree.parent):  # preorder, so children are filled in order
+        children[filled[parent + 1]] = idx
+        filled[parent + 1] += 1
+    tree._child_offset, tree._children = offsets, children
+
+
+def _main_string_types(body):
+    main_types = getattr(body, 'MAIN_CONTENT_STRING_TYPES', None)
+    if main_types is None:  # older beautifulsoup
+        from bs4.element import NavigableString, CData
+        main_types = NavigableString, CData
+    return set(main_types)
+
+
+class TextIndex:
+    """
+    Text of every element below some root elements, computed in a single walk. The text of
+    an element is then a slice of the flattened text, equal to ``element.text``, instead of a
+    new walk of its subtree for every call.
+    """
+    def __init__(self, roots):
+        self._spans = {}  # id(element) -> (element, start, end)
+        self._main_types = None
+        strings, offset = [], 0
+        for root in roots:
+            if id(root) in self._spans:  # already below a previous root
+                continue
+            if self._main_types is None:
+                self._main_types = _main_string_types(root)
+            offset = self._walk(root, strings, offset)
+        self.document = "".join(strings)
+
+    def _walk(self, root, strings, offset):
+        main_types, spans = self._main_types, self._spans
+        stack = [(root, iter(root.contents), offset)]
+        while stack:
+            element, children, start = stack[-1]
+            for child in children:
+                if child.name is None:
+                    if type(child) in main_types:
+                        strings.append(child)
+                        offset += len(child)
+                    continue
+                contents = child.contents
+                if len(contents) == 1 and type(contents[0]) in main_types:
+                    # leaf element holding a single string, the most common case
+                    strings.append(contents[0])
+                    spans[id(child)] = (child, offset, offset + len(contents[0]))
+                    offset += len(contents[0])
+                    continue
+                stack.append((child, iter(contents), offset))
+                break
+            else:
+                stack.pop()
+                spans[id(element)] = (element, start, offset)
+        return offset
+
+    def text(self, element):
+        span = self._spans.get(id(element))
+        interesting = getattr(element, 'interesting_string_types', self._main_types)
+        if span is None or interesting is not self._main_types and set(interesting) != self._main_types:
+            return element.text  # not indexed, or its text does not follow the main content strings
+        return self.document[span[1]:span[2]]
 
 
 def node_constructor(element):
@@ -35,12 +190,19 @@ def node_constructor(element):
     return node
 
 
+def identity_to_parts(identity, tree, base=()):
+    """
+    Return the selector of the identity as a list of node. If base is provided, which must be a
+    prefix of the identity, only the node below base are returned and the walk stop there.
+    """
+    if len(identity) == 0:
+        return []
+    return tree.branch(tree.find(identity), tree.find(base) if len(base) > 0 else -1)
+
+
 def identity_to_branch(identity, tree):
-    branch = None
-    for i in range(1, len(identity) + 1):
-        branch = branch + ' ' + tree[identity[:i]] if branch is not None else tree[identity[:i]]
-    return branch
+    return ' '.join(identity_to_parts(identity, tree)) if len(identity) > 0 else None
 
 
 def find_node(identity, tree):
-    return tree[identity]
+    return tree.node[tree.find(identity)]
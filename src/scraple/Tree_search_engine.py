@@ -1,55 +1,150 @@
 """Contain the core function to traverse the "custom tree structure"."""
 from bs4 import BeautifulSoup as Bs
 
-from typing import Sequence
-from re import search
+from typing import Sequence, Union
+from re import compile as re_compile, Pattern
+from bisect import bisect_left, bisect_right
 
-from TreeCore import appender, identity_to_branch
-from error import SearchError
+from .TreeCore import identity_to_branch
+from .error import SearchError
 
 
-def find_identity_by_string(body, string, string_nth, parent_jump, regex=False):
-    string_nth = [1] if string_nth < 1 else [string_nth]
+def find_identity_by_string(tree, string, string_nth, parent_jump, regex=False, cache=None):
+    string_nth = 1 if string_nth < 1 else string_nth
     parent_jump = 0 if parent_jump < 0 else parent_jump
-    identity = search_string(body, string, string_nth, regex=regex)
+    identity = search_string(tree, string, string_nth, regex=regex, cache=cache)
     if identity is None:
-        raise SearchError(string, string_nth[0])
+        raise SearchError(getattr(string, 'pattern', string), string_nth)
     else:
-        identity = tuple(identity)
         return identity if parent_jump == 0 else identity[:-parent_jump]
 
 
-def search_string(body, string, attempt_remain, regex=False, level=0, id_f=None, idf_temp=None,
-                  level_where_attempt_success=None,
-                  end_search=None):
-    if level == 0:
-        id_f = [None]
-        idf_temp = []
-        level_where_attempt_success = [None]
-        end_search = [False]
-    count = 1
-    for element in body:
-        if element.name is not None:
-            appender(count, idf_temp)
-            count += 1
-            condition_met = search(string, element.text) if regex else string in element.text
-            if condition_met:
-                id_f[0] = idf_temp
-                level_where_attempt_success[0] = level + 1
-            search_string(element, string, attempt_remain, regex, level + 1, id_f, idf_temp.copy(),
-                          level_where_attempt_success, end_search)
-            if end_search[0]:
-                break
-    if level_where_attempt_success[0] is not None:
-        if level_where_attempt_success[0] == level:
-            attempt_remain[0] -= 1
-            if attempt_remain[0] <= 0:
-                end_search[0] = True
+def search_string(tree, string, nth, regex=False, cache=None):
+    """
+    Find the identity of the n-th lowest element which text contain the string, lowest
+    meaning none of its descendant element contain the string.
+
+    :param tree: Tree of the body, see TreeCore.create_Tree.
+    :param string: The string, or the regex pattern (string or compiled) if regex is set.
+        A compiled pattern is always searched as regex.
+    :param regex: True to search the string as regex, or the re flags to compile it with.
+    :param cache: Dictionary to keep the lowest elements of every string searched, so
+        searching the same string again (e.g. for another nth) does not search the page.
+    """
+    key = string, regex
+    lowest = cache.get(key) if cache is not None else None
+    if lowest is None:
+        lowest = lowest_elements(tree, string, regex)
+        if cache is not None:
+            cache[key] = lowest
+    nth = 1 if nth < 1 else nth
+    return tree.identity(lowest[nth - 1]) if nth <= len(lowest) else None
+
+
+def lowest_elements(tree, string, regex=False):
+    """Return the indices of the lowest elements which text contain the string, in order."""
+    if regex or isinstance(string, Pattern):
+        lowest = _regex_lowest(tree, compile_pattern(string, regex))
+        return [i for i in range(len(tree)) if lowest[i]]
+    return _literal_lowest(tree, string)
+
+
+def compile_pattern(pattern: Union[str, Pattern], flags: Union[bool, int] = 0) -> Pattern:
+    """Compile the pattern once, a compiled pattern is used as is unless flags are added."""
+    flags = 0 if isinstance(flags, bool) else flags
+    if isinstance(pattern, Pattern):
+        return pattern if flags == 0 else re_compile(pattern.pattern, pattern.flags | flags)
+    return re_compile(pattern, flags)
+
+
+def _literal_lowest(tree, string):
+    """
+    Every occurrence of the string in the text of the page is mapped to the lowest element
+    containing it, by climbing from the last element starting before the occurrence. Those
+    elements are the lowest ones unless one of them is below another.
+    """
+    offsets = tree._child_offset
+    if string == "":  # every element contain it, so the lowest are the ones without child
+        return [i for i in range(len(tree)) if offsets[i + 1] == offsets[i + 2]]
+
+    length, document = len(string), tree.document
+    if document.count(string) > len(tree):  # frequent string, cheaper to test every element
+        return _literal_lowest_by_element(tree, string)
+    matched = set()
+    position = document.find(string)
+    while position != -1:
+        i = bisect_right(tree.start, position) - 1
+        while i != -1 and (tree.end[i] < position + length or tree.special[i]):
+            i = tree.parent[i]
+        if i != -1:
+            matched.add(i)
+        position = document.find(string, position + 1)
+    i = tree.special.find(1)
+    while i != -1:  # their text is not part of the text of the page
+        if string in tree.text(i):
+            matched.add(i)
+        i = tree.special.find(1, i + 1)
+
+    descendant_matched = set()
+    for i in matched:
+        parent = tree.parent[i]
+        while parent != -1 and parent not in descendant_matched:
+            descendant_matched.add(parent)
+            parent = tree.parent[parent]
+    return sorted(matched - descendant_matched)
+
+
+def _literal_lowest_by_element(tree, string):
+    occurrences = []
+    position = tree.document.find(string)
+    while position != -1:
+        occurrences.append(position)
+        position = tree.document.find(string, position + 1)
+    length = len(string)
+
+    def condition_met(i):
+        if tree.special[i]:
+            return string in tree.text(i)
+        k = bisect_left(occurrences, tree.start[i])
+        return k < len(occurrences) and occurrences[k] + length <= tree.end[i]
+
+    matched = [condition_met(i) for i in range(len(tree))]
+    descendant_matched = [False] * len(tree)
+    for i in range(len(tree) - 1, -1, -1):
+        if (matched[i] or descendant_matched[i]) and tree.parent[i] != -1:
+            descendant_matched[tree.parent[i]] = True
+    return [i for i in range(len(tree)) if matched[i] and not descendant_matched[i]]
+
+
+def _regex_lowest(tree, pattern):
+    """
+    Mark the lowest elements which text match the pattern, leaf first. An element with a
+    matching descendant can not be the lowest so its text is never searched, nor is the text
+    of an element that only wrap a child element which did not match (the same text).
+    """
+    lowest = bytearray(len(tree))
+    descendant_matched = bytearray(len(tree))
+    offsets, children = tree._child_offset, tree._children
+    for i in range(len(tree) - 1, -1, -1):
+        parent = tree.parent[i]
+        if not descendant_matched[i]:
+            if not _wrap_child(tree, i, offsets, children) and pattern.search(tree.text(i)) is not None:
+                lowest[i] = 1
             else:
-                id_f[0] = None
-            level_where_attempt_success[0] = None
-    if level == 0:
-        return id_f[0]
+                continue
+        if parent != -1:
+            descendant_matched[parent] = 1
+    return lowest
+
+
+def _wrap_child(tree, i, offsets, children):
+    """Whether the text of the element is the same as the text of one of its children."""
+    if tree.special[i]:
+        return False
+    for child in children[offsets[i + 1]:offsets[i + 2]]:
+        if tree.start[child] == tree.start[i] and tree.end[child] == tree.end[i] and not tree.special[child]:
+            return True
+    return False
 
 
 def find_parent_identity(existing, added_idx):
@@ -66,27 +161,31 @@ def find_parent_identity(existing, added_idx):
 
 
 def parent_elements(soup: Bs, node) -> Sequence:
-    return soup.select(node)
+    return soup.select(node) if isinstance(node, str) else node.select(soup)
 
 
 def find_follow_path(body, identity, tree):
-    path = None
-    id_cutter = 0
-    cutter_limit = int(len(identity) / 2)
-    while path is None and len(identity) >= cutter_limit:
-        identity = identity[:-id_cutter] if id_cutter > 0 else identity
-        branch = identity_to_branch(identity, tree)
-        elements = body.select(branch)
+    return follow_path(body, follow_branches(identity, tree))
+
+
+def follow_branches(identity, tree):
+    """
+    Return the selectors to try, in order, to find a link to follow: the branch of the
+    identity then the branch of its ancestors up to half of its length.
+    """
+    cutter_limit = max(int(len(identity) / 2), 1)
+    return [identity_to_branch(identity[:length], tree) for length in range(len(identity), cutter_limit - 1, -1)]
+
+
+def follow_path(body, branches):
+    for branch in branches:
+        elements = parent_elements(body, branch)
         if len(elements) > 0:
             element = elements[0]
-            href = element.find(has_href)
+            href = element if has_href(element) else element.find(has_href)
             if href is not None:
-                path = href['href']
-                break
-        else:
-            id_cutter += 1
-
-    return path
+                return href['href']
+    return None
 
 
 def has_href(element):
@@ -21,6 +21,13 @@ Main Features
 - **Rules**: A class that allows the automatic discovery of selectors using string.
   It simplifies the process of defining and applying extraction rules.
 
+- **RulIn**: The extract rule produced by Rules, which can be saved and loaded back.
+
+- **ExtractorGroup**: A class that extract several rules from a page parsed only once.
+
+- **Metrics**: An opt-in recorder of the time spent in every stage of Rules and
+  SimpleExtractor, and of the slowest fields of a rule.
+
 Exception
 --------------
 Scraple includes the following error classes:
@@ -40,5 +47,31 @@ For more information visit https://github.com/max-efort/.
 
 """
 
-from extract import SimpleExtractor, Rules
-from error import *
+from importlib import import_module
+
+# the classes are imported from their module when first accessed, so importing scraple
+# does not import beautifulsoup until Rules or SimpleExtractor is used
+_lazy_attributes = {
+    "SimpleExtractor": "extract",
+    "Rules": "extract",
+    "RulIn": "extract",
+    "ExtractorGroup": "extract",
+    "Metrics": "metrics",
+    "ParsingError": "error",
+    "SearchError": "error",
+    "ExtractError": "error",
+}
+__all__ = list(_lazy_attributes)
+
+
+def __getattr__(name):
+    module = _lazy_attributes.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
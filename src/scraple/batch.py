@@ -0,0 +1,125 @@
+"""
+Contain the columnar output of the extraction and the sinks it can be written to.
+
+Items are gathered into batches, a dictionary of {"field name": [value, ...]} with one list
+per field, which can be given directly to pandas.DataFrame or pyarrow instead of building a
+table row by row. Field without pipeline are turned into html string as soon as the item is
+extracted, so a batch never hold a reference to the parsed page.
+"""
+import csv
+import json
+import os
+from typing import Iterable, Iterator, Optional, Sequence
+
+from .parallel import plain_item
+from .plan import ExtractPlan, extract_items
+
+
+def column_batches(items: Iterable[dict], names: Sequence, batch_size: int = 1024) -> Iterator[dict]:
+    """Gather the dictionaries of items into batches of at most batch_size rows."""
+    batch_size = max(1, batch_size)
+    batch, rows = {name: [] for name in names}, 0
+    for item in items:
+        for name in names:
+            batch[name].append(item[name])
+        rows += 1
+        if rows == batch_size:
+            yield batch
+            batch, rows = {name: [] for name in names}, 0
+    if rows > 0:
+        yield batch
+
+
+def plan_items(parents: list, plan: ExtractPlan, chunk_size: int = 1024, metrics=None) -> Iterator[dict]:
+    """Extract the parents chunk by chunk, dropping every element from the list once extracted."""
+    for start in range(0, len(parents), chunk_size):
+        chunk = parents[start:start + chunk_size]
+        parents[start:start + chunk_size] = [None] * len(chunk)
+        for item in extract_items(chunk, plan.fields, metrics):
+            yield plain_item(item)
+
+
+class JsonlSink:
+    """Write every row as a JSON object on its own line."""
+    def __init__(self, path: str, encoding: str = "utf8"):
+        self._file = open(path, "w", encoding=encoding, newline="")
+
+    def write(self, batch: dict) -> None:
+        names = list(batch)
+        for row in zip(*batch.values()):
+            self._file.write(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvSink(JsonlSink):
+    """Write the rows as CSV with the field names as header, list value are written as JSON."""
+    def __init__(self, path: str, encoding: str = "utf8"):
+        super().__init__(path, encoding)
+        self._writer = None
+
+    def write(self, batch: dict) -> None:
+        if self._writer is None:
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(list(batch))
+        self._writer.writerows(
+            [json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+             for value in row]
+            for row in zip(*batch.values())
+        )
+
+
+class ParquetSink:
+    """Write every batch as a row group of a Parquet file, require pyarrow."""
+    def __init__(self, path: str):
+        import pyarrow.parquet
+        self._parquet = pyarrow.parquet
+        self._path = path
+        self._writer = None
+
+    def write(self, batch: dict) -> None:
+        import pyarrow
+        if self._writer is None:
+            table = pyarrow.Table.from_pydict(batch)
+            self._writer = self._parquet.ParquetWriter(self._path, table.schema)
+        else:
+            table = pyarrow.Table.from_pydict(batch, schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+sinks = {
+    "jsonl": JsonlSink,
+    "csv": CsvSink,
+    "parquet": ParquetSink,
+}
+
+
+def open_sink(path: str, format_: Optional[str] = None):
+    """
+    Open a sink writing to path, the format is taken from the extension of the path if
+    not provided.
+
+    :raise ValueError: If the format is not one of "jsonl", "csv" or "parquet".
+    """
+    format_ = (format_ or os.path.splitext(path)[1].lstrip(".")).lower()
+    format_ = "jsonl" if format_ in ("json", "ndjson") else format_
+    if format_ not in sinks:
+        raise ValueError(f"unknown sink format {format_!r}, expected one of {', '.join(sinks)}")
+    return sinks[format_](path)
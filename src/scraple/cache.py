@@ -0,0 +1,29 @@
+"""
+Contain the function to key the on-disk cache of extract rule.
+
+A cached rule is keyed by the digest of the reference content, the parser and every
+add_field_rule call, so an unchanged reference with the same calls give the same rule.
+"""
+import hashlib
+import json
+import os
+
+cache_version = 2
+
+
+def reference_digest(reference, flag: str) -> str:
+    flag = flag.lower()
+    digest = hashlib.sha256()
+    if flag == 'local':
+        with open(reference, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+    else:
+        content = str(reference) if flag == 'parsed' else reference
+        digest.update(content.encode("utf8") if isinstance(content, str) else content)
+    return digest.hexdigest()
+
+
+def rule_cache_path(cache_dir: str, digest: str, parser: str, calls: list, minimal_selector: bool = False) -> str:
+    key = json.dumps([cache_version, digest, parser, calls, minimal_selector], ensure_ascii=False, default=str)
+    return os.path.join(cache_dir, hashlib.sha256(key.encode("utf8")).hexdigest() + ".json")
@@ -0,0 +1,130 @@
+"""
+Contain the asyncio crawler used by SimpleExtractor.crawl.
+
+Pages are fetched by a pluggable async transport, parsed and extracted in an executor so
+the event loop never block, and the link found by the follow selectors (e.g. the "Next"
+button of a pager) is queued to be crawled too. The error of a page (e.g. HTTP 404) is
+raised, skipped or yielded with its url, the other pages are not affected by the last two.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, Optional, Sequence, Tuple, Union
+from urllib.parse import urldefrag, urljoin
+from urllib.request import urlopen
+
+from .Tree_search_engine import follow_path
+from .extract import refine_body
+from .parallel import plain_item
+from .plan import ExtractPlan, extract_items, find_items
+
+
+class UrllibTransport:
+    """Transport using the builtin urllib in a pool of threads, it does not reuse connection."""
+    def __init__(self, concurrency: int = 64, timeout: float = 30):
+        self._executor = ThreadPoolExecutor(concurrency)
+        self.timeout = timeout
+
+    def _fetch(self, url: str) -> bytes:
+        with urlopen(url, timeout=self.timeout) as response:
+            return response.read()
+
+    async def fetch(self, url: str) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._fetch, url)
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class AiohttpTransport:
+    """Transport using a pool of connection of aiohttp, up to concurrency connection are kept open."""
+    def __init__(self, concurrency: int = 64, timeout: float = 30):
+        import aiohttp
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        )
+
+    async def fetch(self, url: str) -> bytes:
+        async with self._session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def close(self) -> None:
+        await self._session.close()
+
+
+def default_transport(concurrency: int):
+    try:
+        return AiohttpTransport(concurrency)
+    except ImportError:
+        return UrllibTransport(concurrency)
+
+
+def crawl_page(body: bytes, plan: ExtractPlan, parser: str, follow: Sequence) -> Tuple[list, Optional[str]]:
+    body = refine_body(body, "html", parser)
+    parents, selected = find_items(body, plan)
+    items = [plain_item(item) for item in extract_items(parents, plan.fields, selected=selected)]
+    return items, follow_path(body, follow) if len(follow) > 0 else None
+
+
+async def crawl_pages(
+        plan: ExtractPlan,
+        parser: str,
+        start_urls: Iterable[str],
+        follow: Sequence = (),
+        concurrency: int = 64,
+        transport=None,
+        executor=None,
+        max_pages: Optional[int] = None,
+        on_error: str = "raise"
+) -> AsyncIterator[Tuple[str, Union[list, Exception]]]:
+    loop = asyncio.get_running_loop()
+    own_transport = transport is None
+    transport = default_transport(concurrency) if own_transport else transport
+    urls, results = asyncio.Queue(), asyncio.Queue()
+    seen, done = set(), object()
+
+    def schedule(url):
+        if url not in seen and (max_pages is None or len(seen) < max_pages):
+            seen.add(url)
+            urls.put_nowait(url)
+
+    async def worker():
+        while True:
+            url = await urls.get()
+            try:
+                body = await transport.fetch(url)
+                items, path = await loop.run_in_executor(executor, crawl_page, body, plan, parser, follow)
+                if path:
+                    schedule(urldefrag(urljoin(url, path))[0])
+                await results.put((url, items))
+            except Exception as error:  # fetching, parsing or extracting the page
+                await results.put((url, error))
+            finally:
+                urls.task_done()
+
+    async def join():
+        await urls.join()
+        await results.put(done)
+
+    for start_url in start_urls:
+        schedule(start_url)
+    tasks = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+    tasks.append(asyncio.ensure_future(join()))
+    try:
+        while True:
+            result = await results.get()
+            if result is done:
+                break
+            if isinstance(result[1], Exception):
+                if on_error == "raise":
+                    raise result[1]
+                if on_error == "skip":
+                    continue
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_transport:
+            await transport.close()
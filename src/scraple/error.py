@@ -7,6 +7,10 @@ class ParsingError(Exception):
                   f"the right argument with the right flag {flags.__str__()}, " \
                   f"the flag you passed was '{flag}'."
         super().__init__(message)
+        self.flag = flag
+
+    def __reduce__(self):
+        return self.__class__, (self.flag,)
 
 
 class SearchError(Exception):
@@ -23,6 +27,10 @@ class SearchError(Exception):
                   f"either there is dummy text present{msg2}or the DOM is " \
                   f"too sophisticated to parse{msg3}"
         super().__init__(message)
+        self.string, self.nth = string, nth
+
+    def __reduce__(self):
+        return self.__class__, (self.string, self.nth)
 
 
 class ExtractError(Exception):
@@ -31,3 +39,6 @@ class ExtractError(Exception):
               "either the DOM change by sophisticated anti-scrap method or you provide an " \
               "incompatible web page with the rule."
         super().__init__(msg)
+
+    def __reduce__(self):
+        return self.__class__, ()
@@ -1,37 +1,185 @@
 """
 Contain the core API class of scraping and defining rules.
 """
-from typing import Union, Optional, Callable, Generator, TypeAlias
+import json
+import os
+from functools import partial
+from importlib import import_module
+from types import MappingProxyType
+from re import Pattern
+from typing import Union, Optional, Callable, Dict, Generator, Iterable, Iterator, AsyncIterator, Mapping, Sequence, Tuple, TypeAlias
+
+from bs4.builder import builder_registry
+
+from .cache import reference_digest, rule_cache_path
+from .TreeCore import create_Tree, identity_to_branch, identity_to_parts
+from .Tree_search_engine import find_identity_by_string, find_parent_identity, follow_branches, Bs
+from .error import *
+from .generalize import SelectorIndex, page_tokens
+from .metrics import Metrics, stage
+from .pipeline import text, clean_text, tags, link
+from .plan import compile_plan, compile_selector, extract_items, find_items, find_parents, group_items
+from .source import read_local
+from .stream import stream_items
+from .template import TemplateCache
+
+pipelines = {"text": text, "clean_text": clean_text, "tags": tags, "link": link}
+selector: TypeAlias = str
+parser_name: TypeAlias = Union[str, Sequence[str]]
+default_parser = "html.parser"
 
-from TreeCore import create_Tree, identity_to_branch
-from Tree_search_engine import find_identity_by_string, find_parent_identity, parent_elements, Bs
-from error import *
-from pipeline import text, tags, link
 
-pipelines = {"text": text, "tags": tags, "link": link}
-selector: TypeAlias = str
+def resolve_parser(parser: Optional[parser_name] = None) -> str:
+    """
+    Return the first parser name which tree builder is installed, fall back to the
+    builtin "html.parser" if none of them are.
+    """
+    candidates = [parser] if isinstance(parser, str) else parser if parser is not None else []
+    for candidate in candidates:
+        if builder_registry.lookup(candidate) is not None:
+            return candidate
+    return default_parser
+
 
+def pipeline_name(pipeline: Optional[Callable]) -> Optional[str]:
+    """
+    Return the name of a pipeline function, the key of the builtin pipelines or the
+    "module:qualified name" of other function.
 
-def refine_body(obj, flag):
-    obj = open(obj, encoding="utf8") if flag.lower() == 'local' else obj
+    :raise ValueError: If the function can not be imported back by its name (lambda or
+        function defined inside another function).
+    """
+    if pipeline is None:
+        return None
+    for name in pipelines:
+        if pipelines[name] is pipeline:
+            return name
+    module, qualname = getattr(pipeline, '__module__', None), getattr(pipeline, '__qualname__', '')
+    if module is None or '<' in qualname:
+        raise ValueError(f"The pipeline {pipeline!r} can not be saved by name, "
+                         f"define it at module level.")
+    return f"{module}:{qualname}"
+
+
+def pipeline_from_name(name: Optional[str]) -> Optional[Callable]:
+    if name is None:
+        return None
+    if name in pipelines:
+        return pipelines[name]
+    module, qualname = name.split(":")
+    pipeline = import_module(module)
+    for attribute in qualname.split("."):
+        pipeline = getattr(pipeline, attribute)
+    return pipeline
+
+
+def _set_frozen(obj, **attributes) -> None:
+    """Set the attributes of an object which __setattr__ forbid it, in its __init__."""
+    for name, value in attributes.items():
+        object.__setattr__(obj, name, value)
+
+
+def refine_body(obj, flag, parser=None):
+    encoding = None
+    if flag.lower() == 'local':
+        obj, encoding = read_local(obj)
+    return parse_body(obj, flag, parser, encoding)
+
+
+def parse_body(obj, flag, parser=None, encoding=None):
     try:
-        obj = Bs(obj, features="html.parser") if flag.lower() != 'parsed' else obj
+        obj = Bs(obj, features=resolve_parser(parser), from_encoding=encoding) if flag.lower() != 'parsed' else obj
         return obj.body if obj.body is not None else obj
     except:
         raise ParsingError(flag)
 
 
+def metered_body(obj, flag, parser, metrics: Metrics):
+    """Same as refine_body, recording the reading, parsing and size of the page in metrics."""
+    encoding = None
+    if flag.lower() == 'local':
+        with metrics.stage("read"):
+            size = os.path.getsize(obj)
+            obj, encoding = read_local(obj)
+    elif isinstance(obj, (str, bytes)):
+        size = len(obj) if isinstance(obj, bytes) else len(obj.encode("utf8"))
+    else:
+        size = 0
+    metrics.record_page(size)
+    with metrics.stage("parse"):
+        return parse_body(obj, flag, parser, encoding)
+
+
 class RulIn:
     """
     Intermediate object as an interface between Rules and SimpleExtractor class
+
+    Beside the selectors, a rule made by Rules record the structural path of the parent
+    (from the body) and of every field (from the parent) as the list of "tag.class#id" of
+    every level, used by the "path" engine of SimpleExtractor.
+
+    A RulIn object is immutable, so it can be shared between threads.
     """
+    __slots__ = ("parent", "fields", "parent_path", "field_paths")
+
     def __init__(self, rule):
-        self.parent = rule[0]
-        self.fields = rule[1]
+        _set_frozen(
+            self,
+            parent=rule[0],
+            fields=MappingProxyType(dict(rule[1])),  # field name : (selector, pipeline)
+            parent_path=tuple(rule[2]) if len(rule) > 2 and rule[2] is not None else None,  # (node, ...) or None
+            field_paths=MappingProxyType({key: tuple(path) for key, path in rule[3].items()} if len(rule) > 3 else {})
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} object is immutable")
+
+    def __reduce__(self):
+        return type(self), ([self.parent, dict(self.fields), self.parent_path, dict(self.field_paths)],)
 
     def __str__(self):
         return f'Parent Selector:\n\t{self.parent.__str__()}\n' \
-               f'Field Rule:\n\t{self.fields.__str__()}\n'
+               f'Field Rule:\n\t{dict(self.fields).__str__()}\n'
+
+    def save(self, path: str) -> None:
+        """
+        Save the rule as a JSON file. Pipeline is saved by name, the builtin one by its
+        name ("text", "tags", "link") and other function by its module and qualified name.
+
+        :param path: Path of the file.
+
+        :raise ValueError: If a pipeline is a function that can not be imported back by
+            its name, e.g. a lambda.
+        """
+        rule = {
+            "parent": self.parent,
+            "fields": [[key, selector_, pipeline_name(pipeline)]
+                       for key, (selector_, pipeline) in self.fields.items()]
+        }
+        if self.parent_path is not None:
+            rule["parent_path"] = self.parent_path
+        if self.field_paths:
+            rule["field_paths"] = [[key, path] for key, path in self.field_paths.items()]
+        with open(path, "w", encoding="utf8") as file:
+            json.dump(rule, file, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> "RulIn":
+        """
+        Load a rule saved by RulIn.save().
+
+        :param path: Path of the file.
+
+        :raise FileNotFoundError: If the file was not found.
+        """
+        with open(path, encoding="utf8") as file:
+            rule = json.load(file)
+        return cls([
+            rule["parent"],
+            {key: (selector_, pipeline_from_name(pipeline)) for key, selector_, pipeline in rule["fields"]},
+            rule.get("parent_path"),
+            {key: path for key, path in rule.get("field_paths", [])}
+        ])
 
 
 class Rules:
@@ -43,12 +191,18 @@ class Rules:
     """
     def __init__(
             self,
-            reference: Union[Bs, str, bytes],
-            page_flag: str
+            reference: Union[Bs, str, bytes, Sequence[Union[Bs, str, bytes]]],
+            page_flag: str,
+            parser: Optional[parser_name] = None,
+            cache_dir: Optional[str] = None,
+            metrics: Optional[Metrics] = None,
+            minimal_selector: Optional[bool] = None
     ):
         """
         :param reference: An object used as reference, either a BeautifulSoup object,
-            a string of local path of html file, or a string of html code.
+            a string of local path of html file, or a string of html code. Or a list of
+            them (with the same flag), the strings of add_field_rule are searched in the
+            first one and the others are only used to tell the stable classes and ids.
         :param page_flag: Flag of the reference, determine how the reference
             will be preprocessed.
 
@@ -57,21 +211,67 @@ class Rules:
             - "local" : use it for string of local path.
             - "html"  : use it for byte or string of html code.
 
+        :param parser: Name of the beautifulsoup parser used for the reference, e.g. "lxml",
+            or a sequence of names in order of preference. The first installed parser
+            is used, falling back to the builtin "html.parser" which is also the default.
+        :param cache_dir: Directory to cache the extract rule. If provided, the reference is
+            only parsed and searched when the extract rule is needed and not found in the
+            cache. The cache key is the content of the reference, the parser and every call
+            to add_field_rule, so the SearchError of add_field_rule is raised by
+            get_extract_rule instead, and the rule of the failed call is dropped.
+        :param metrics: A Metrics object to record the time of reading, parsing and
+            searching the reference.
+        :param minimal_selector: Generalize the selectors into the shortest one made of
+            stable tag, class and id (see generalize.py) instead of naming every class and id
+            of the branch. Default to True if several references are given, False otherwise.
+
         :raise ParsingError: If parsing of reference encounter unexpected error.
         :raise FileNotFoundError: If the reference_flag is "local" and the file was not found.
         """
         self._count = 0
-        self._reference = refine_body(reference, page_flag)
-        self._tree = create_Tree(self._reference)
-
+        self._parser = resolve_parser(parser)
+        self._cache_dir = cache_dir
+        self._metrics = metrics
+        self._calls = []  # every add_field_rule call, [entry_num, string, field_name, re_flag, climb, nth, pipeline]
+        self._pending_calls = []  # calls of add_field_rules not searched yet, with cache_dir
         self._fields = {}  # entry_num : ["The field name", "branch_id", pipeline]
         self._parent = None  # the value is a idx (tuple)
 
+        references = list(reference) if isinstance(reference, (list, tuple)) else [reference]
+        self._minimal_selector = len(references) > 1 if minimal_selector is None else minimal_selector
+        self._other_references = [(reference_, page_flag) for reference_ in references[1:]]
+        self._stable = None  # tokens of every other reference
+
+        self._reference = None
+        if cache_dir is None:
+            self._load_reference(references[0], page_flag)
+        else:
+            self._pending_reference = references[0], page_flag
+            self._reference_digest = ','.join(reference_digest(reference_, page_flag) for reference_ in references)
+
+    def _load_reference(self, reference, page_flag):
+        if self._metrics is None:
+            body = refine_body(reference, page_flag, self._parser)
+        else:
+            body = metered_body(reference, page_flag, self._parser, self._metrics)
+        with stage(self._metrics, "create_tree"):
+            tree = create_Tree(body)
+        error = None
+        for calls in self._pending_calls:  # every add_field_rules call, a call that fail is dropped as a whole
+            try:
+                self._search_fields(calls, tree)
+            except Exception as error_:
+                error = error_ if error is None else error
+                self._calls = [call for call in self._calls if all(call is not failed for failed in calls)]
+        self._reference, self._tree, self._pending_calls = body, tree, []
+        if error is not None:
+            raise error
+
     def add_field_rule(
             self,
-            string: str,
+            string: Union[str, Pattern],
             field_name: Optional[str] = None,
-            re_flag: bool = False,
+            re_flag: Union[bool, int] = False,
             climb: int = 0,
             find_string_of_nth: int = 1,
             pipeline: Optional[Union[Callable, str]] = None
@@ -79,9 +279,11 @@ class Rules:
         """
         Adding a rule to locate an element inside the DOM using string.
 
-        :param string: The string used to locate an element.
+        :param string: The string used to locate an element, or a compiled regex pattern
+            (re.compile) in which case the search always use regex.
         :param field_name: Name to identify the rule name or field name.
-        :param re_flag: Flag to use regex in the search.
+        :param re_flag: Flag to use regex in the search. Instead of True, the re flags
+            (e.g. re.IGNORECASE) to compile the pattern with can be passed.
         :param climb: Number indicating to search for the parent of n-th relative
             to the lowest element containing the string.
         :param find_string_of_nth: Number indicating to find for n-th string.
@@ -95,33 +297,78 @@ class Rules:
 
         :raise SearchError: If the string used to identify an element is not found.
         """
-        self._count += 1
-        field_name = self._count if field_name is None else field_name
+        self.add_field_rules([(string, field_name, re_flag, climb, find_string_of_nth, pipeline)])
+
+    def add_field_rules(self, specs: Iterable[Union[Mapping, Sequence]]) -> None:
+        """
+        Adding many rules at once, the same as calling add_field_rule for every spec except
+        that the page is searched only once for every distinct string (and re_flag), and the
+        parent is updated once. If a string is not found, none of the rules is added.
 
-        self._fields[self._count] = [
-            field_name,
+        :param specs: Iterable of either a dictionary of the arguments of add_field_rule, e.g.
+            {"string": "Einstein", "field_name": "Author", "pipeline": "text"}, or a tuple
+            of them in the same order, e.g. ("Einstein", "Author").
+
+        :return: None
+
+        :raise SearchError: If the string of one of the rules is not found.
+        """
+        calls = []
+        for spec in specs:
+            entry_num = self._count + len(calls) + 1
+            calls.append(self._new_call(entry_num, **spec) if isinstance(spec, Mapping)
+                         else self._new_call(entry_num, *spec))
+        if self._reference is not None:
+            self._search_fields(calls, self._tree)
+        else:
+            self._pending_calls.append(calls)
+        self._count += len(calls)
+        self._calls.extend(calls)
+
+    @staticmethod
+    def _new_call(entry_num, string, field_name=None, re_flag=False, climb=0, find_string_of_nth=1, pipeline=None):
+        field_name = entry_num if field_name is None else field_name
+
+        if isinstance(pipeline, str):  # adding pipeline for field
+            pipeline = pipelines.get(pipeline.lower())
+        elif not isinstance(pipeline, type(text)):
+            pipeline = None
+        return [entry_num, string, field_name, re_flag, climb, find_string_of_nth, pipeline]
+
+    def _search_fields(self, calls, tree):
+        with stage(self._metrics, "search"):
+            identities = self._find_identities(calls, tree)
+        parent = self._parent
+        for (entry_num, _, field_name, *_, pipeline), identity in zip(calls, identities):
+            self._fields[entry_num] = [field_name, identity, pipeline]
+            parent = find_parent_identity(parent, identity)
+        self._parent = parent
+
+    @staticmethod
+    def _find_identities(calls, tree):
+        cache = {}  # lowest elements of every string, shared by the calls
+        return [
             find_identity_by_string(
-                self._reference,
+                tree,
                 string,
                 parent_jump=climb,
                 string_nth=find_string_of_nth,
-                regex=re_flag
+                regex=re_flag,
+                cache=cache
             )
+            for _, string, _, re_flag, climb, find_string_of_nth, _ in calls
         ]
-        if pipeline is not None:  # adding pipeline for field
-            if isinstance(pipeline, type(text)):
-                self._fields[self._count].append(pipeline)
-            elif isinstance(pipeline, str):
-                pipeline = pipeline.lower()
-                self._fields[self._count].append(
-                    pipelines[pipeline]) if pipeline in pipelines else self._fields[
-                    self._count].append(None)
-            else:
-                self._fields[self._count].append(None)
-        else:
-            self._fields[self._count].append(None)
 
-        self._parent = find_parent_identity(self._parent, self._fields[self._count][1])
+    def _ensure_reference(self) -> None:
+        if self._reference is None:
+            self._load_reference(*self._pending_reference)
+
+    def _cached_rule_path(self) -> Optional[str]:
+        try:
+            calls = [call[1:-1] + [pipeline_name(call[-1])] for call in self._calls]
+        except ValueError:  # the rule can not be saved
+            return None
+        return rule_cache_path(self._cache_dir, self._reference_digest, self._parser, calls, self._minimal_selector)
 
     def get_extract_rule(self) -> RulIn:
         """
@@ -131,23 +378,73 @@ class Rules:
         A RulIn object can be passed to the SimpleExtractor constructor instead
         of the "raw" Rules object.
         """
-        parent = identity_to_branch(self._parent, self._tree)
-        rule = [parent, {}]
-        for key in self._fields:
-            full_branch = identity_to_branch(self._fields[key][1], self._tree)
+        path = self._cached_rule_path() if self._cache_dir is not None else None
+        if path is not None and os.path.exists(path):
+            return RulIn.load(path)
 
-            full_branch = full_branch.split(parent)[1]
-            rule[1][self._fields[key][0]] = full_branch, self._fields[key][2]
-        return RulIn(rule)
+        self._ensure_reference()
+        if self._minimal_selector:
+            rule = RulIn(self._minimal_rule())
+        else:
+            parent = identity_to_branch(self._parent, self._tree)
+            rule = [parent, {}, identity_to_parts(self._parent, self._tree) or None, {}]
+            for key in self._fields:
+                # the field identity always start with the parent identity, only walk the part below it
+                parts = identity_to_parts(self._fields[key][1], self._tree, base=self._parent)
+                rule[1][self._fields[key][0]] = ''.join(' ' + node for node in parts), self._fields[key][2]
+                if parts:
+                    rule[3][self._fields[key][0]] = parts
+            rule = RulIn(rule)
+        if path is not None:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            rule.save(path)
+        return rule
+
+    def _minimal_rule(self) -> list:
+        tree = self._tree
+        with stage(self._metrics, "generalize"):
+            index = SelectorIndex(tree)
+            stable = self._stable_tokens()
+            parent_idx, parent, parent_path, within = -1, None, None, None
+            if len(self._parent) > 0:
+                parent_idx = tree.find(self._parent)
+                chain, exact = index.stable_chain(parent_idx, stable=stable)
+                parent = index.minimal_selector(chain)
+                parent_path = tree.branch(parent_idx) if exact else None  # a path only follow exact node
+                within = index.below(index.match(chain))
+            rule = [parent, {}, parent_path, {}]
+            for field_name, identity, pipeline in self._fields.values():
+                if identity == self._parent:
+                    rule[1][field_name] = '', pipeline
+                    continue
+                idx = tree.find(identity)
+                chain, exact = index.stable_chain(idx, parent_idx, stable)
+                rule[1][field_name] = ' ' + index.minimal_selector(chain, within), pipeline
+                if exact:
+                    rule[3][field_name] = tree.branch(idx, parent_idx)
+        return rule
+
+    def _stable_tokens(self) -> Optional[set]:
+        if self._stable is None and len(self._other_references) > 0:
+            for reference, page_flag in self._other_references:
+                if self._metrics is None:
+                    tokens = page_tokens(refine_body(reference, page_flag, self._parser))
+                else:
+                    tokens = page_tokens(metered_body(reference, page_flag, self._parser, self._metrics))
+                self._stable = tokens if self._stable is None else self._stable & tokens
+        return self._stable
 
     def get_parent_selector(self) -> selector:
         """Get the CSS selector of the lowest parent element where,
         all the referred element when adding rule, is contained.
         """
+        if self._reference is None or self._minimal_selector:
+            return self.get_extract_rule().parent
         return identity_to_branch(self._parent, self._tree)
 
     def get_reference_soup(self) -> Bs:
         """Get the beautifulsoup object of the reference page."""
+        self._ensure_reference()
         return self._reference
 
     def __str__(self):
@@ -155,25 +452,75 @@ class Rules:
 
 
 class SimpleExtractor:
-    """A class that capable of extracting item from a page based on the rule provided"""
+    """
+    A class that capable of extracting item from a page based on the rule provided
+
+    A SimpleExtractor object is immutable and its extraction methods do not change any
+    shared state except the Metrics and TemplateCache objects passed to it, which are
+    thread-safe, so one object can be used by many threads at the same time.
+
+    It can be copied and pickled (e.g. sent to another process) as long as its pipelines
+    are defined at module level and it has no Metrics object, a pickled TemplateCache is
+    received empty.
+    """
+    __slots__ = ("parser", "metrics", "parent", "fields", "engine", "template_cache", "_plan")
+
     def __init__(
             self,
-            rule: Union[Rules, RulIn]
+            rule: Union[Rules, RulIn],
+            parser: Optional[parser_name] = None,
+            metrics: Optional[Metrics] = None,
+            engine: str = "css",
+            template_cache: Optional[TemplateCache] = None
     ):
         """
-        Instantiate the object with its extract rule.
+        Instantiate the object with its extract rule. The rule is compiled once here.
 
         :param rule: A Rules or RulIn object as rule to extract element from web page.
+        :param parser: Name of the beautifulsoup parser used for the page, or a sequence
+            of names in order of preference. If not provided, the parser of the Rules object
+            is used, "html.parser" otherwise.
+        :param metrics: A Metrics object to record the stages of perform_extraction and
+            perform_batch_extraction, the selector matches and the time of every field.
+        :param engine: How the parent and field elements are found, "css" match the selectors,
+            "path" follow the structural path recorded in the rule and use the selector only
+            where the page structure differ from the reference (nothing at the path, or an
+            element at another depth that match the selector), so the items are the same.
+        :param template_cache: A TemplateCache, to reuse the matches of perform_extraction
+            for the pages with the same skeleton (see template.py).
+
+        :raise ValueError: If the engine is not "css" or "path".
         """
+        if engine not in ("css", "path"):
+            raise ValueError(f"unknown engine {engine!r}, expected 'css' or 'path'")
+        if parser is None and isinstance(rule, Rules):
+            parser = rule._parser
         rule = rule.get_extract_rule() if isinstance(rule, Rules) else rule
-        self.parent = rule.parent
-        self.fields = rule.fields
+        fields = MappingProxyType(dict(rule.fields))
+        if engine == "path":
+            plan = compile_plan(rule.parent, fields, getattr(rule, "parent_path", None), getattr(rule, "field_paths", None))
+        else:
+            plan = compile_plan(rule.parent, fields)
+        _set_frozen(self, parser=resolve_parser(parser), metrics=metrics, parent=rule.parent, fields=fields,
+                    engine=engine, template_cache=template_cache, _plan=plan)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} object is immutable, create a new one instead")
+
+    def __reduce__(self):
+        plan = self._plan
+        rule = RulIn([self.parent, dict(self.fields), plan.parent_path,
+                      {field.name: field.path for field in plan.fields if field.path is not None}])
+        return type(self), (rule, self.parser, self.metrics, self.engine, self.template_cache)
 
     def perform_extraction(
             self,
             body: Union[Bs, str, bytes],
             page_flag: str,
-            iterate_parent_element_instead: bool = False
+            iterate_parent_element_instead: bool = False,
+            parser: Optional[parser_name] = None,
+            limit: Optional[int] = None,
+            offset: int = 0
     ) -> Generator[dict, None, None]:
         """
         Perform  extraction using the rule provided.
@@ -189,6 +536,10 @@ class SimpleExtractor:
             will be preprocessed.
         :param iterate_parent_element_instead: A flag, if you want to iterate the parent
             element (lowest element where all the CSS selector from the rule met).
+        :param parser: Override the parser of the extractor for this page.
+        :param limit: Extract at most that many items. The page is then only matched until
+            enough parent elements are found.
+        :param offset: Number of items to skip before the first extracted one.
 
         :return: Generator object which iterate dictionary:
             {
@@ -200,19 +551,437 @@ class SimpleExtractor:
         :raise ParsingError: If parsing of scraping subject encounter unexpected error.
         :raise FileNotFoundError: If the page_flag is "local" and the file was not found.
         """
-        body = refine_body(body, page_flag)
-        parents = parent_elements(body, self.parent)
-        if len(parents) < 1:
-            raise ExtractError()
-        
-        for item in parents:
+        if limit is not None and limit < 1:
+            return
+        offset = max(0, offset)
+        if self.template_cache is None or limit is not None:  # a template need the whole page
+            limit = None if limit is None else offset + limit
             if iterate_parent_element_instead:
-                yield item
+                parents, selected = self._page_parents(body, page_flag, parser, limit), None
             else:
-                extracted = {}
-                for key in self.fields:
-                    selector_ = self.fields[key][0]
-                    child = item.select(selector_) if selector_ != "" else [item]
-                    extracted[key] = child if self.fields[key][1] is None \
-                        else self.fields[key][1](child)
-                yield extracted
+                parents, selected = self._page_parents(body, page_flag, parser, limit, fields=True)
+        else:
+            parents, selected = self._page_template(body, page_flag, parser)
+        if offset > 0:
+            parents = parents[offset:]
+            selected = None if selected is None else [field[offset:] for field in selected]
+        if iterate_parent_element_instead:
+            yield from parents
+        else:
+            yield from extract_items(parents, self._plan.fields, self.metrics, selected)
+
+    def _page_template(self, body, page_flag, parser):
+        parser = self.parser if parser is None else parser
+        metrics = self.metrics
+        if metrics is None:
+            parents, selected = self.template_cache.resolve(refine_body(body, page_flag, parser), self._plan)
+        else:
+            body = metered_body(body, page_flag, parser, metrics)
+            with metrics.stage("template"):
+                parents, selected = self.template_cache.resolve(body, self._plan)
+            metrics.record_items(len(parents))
+        if len(parents) < 1:
+            raise ExtractError()
+        return parents, selected
+
+    def first(
+            self,
+            body: Union[Bs, str, bytes],
+            page_flag: str,
+            parser: Optional[parser_name] = None
+    ) -> dict:
+        """
+        Extract only the first item of the page, the page is matched until the first
+        parent element is found. Same as next(perform_extraction(..., limit=1)).
+
+        :raise ExtractError: If there is no element that match the rule.
+        :raise ParsingError: If parsing of scraping subject encounter unexpected error.
+        :raise FileNotFoundError: If the page_flag is "local" and the file was not found.
+        """
+        return next(self.perform_extraction(body, page_flag, parser=parser, limit=1))
+
+    def _page_parents(self, body, page_flag, parser, limit=None, fields=False):
+        """
+        Return the parent elements, or (parents, selected) as find_items if fields is True,
+        to have the field elements checked for the whole page by the path engine.
+        """
+        parser = self.parser if parser is None else parser
+        find = find_items if fields else find_parents
+        metrics = self.metrics
+        if metrics is None:
+            found = find(refine_body(body, page_flag, parser), self._plan, limit)
+        else:
+            body = metered_body(body, page_flag, parser, metrics)
+            with metrics.stage("parent_select"):
+                found = find(body, self._plan, limit)
+        parents = found[0] if fields else found
+        if metrics is not None:
+            metrics.record_items(len(parents))
+        if len(parents) < 1:
+            raise ExtractError()
+        return found
+
+    def perform_batch_extraction(
+            self,
+            body: Union[Bs, str, bytes],
+            page_flag: str,
+            batch_size: int = 1024,
+            parser: Optional[parser_name] = None
+    ) -> Generator[dict, None, None]:
+        """
+        Perform extraction and gather the items into columnar batches, e.g. to build a
+        pandas DataFrame with pandas.DataFrame(batch) instead of concatenating row by row.
+
+        Field without pipeline contain list of html string of the elements instead of the
+        elements, and every parent element is released once extracted, so a batch does not
+        keep the page alive.
+
+        :param body: An object of either a BeautifulSoup object,
+            a string of local path or a string of html code.
+        :param page_flag: Flag of the "body" object, same as perform_extraction.
+        :param batch_size: Maximum number of items in a batch.
+        :param parser: Override the parser of the extractor for this page.
+
+        :return: Generator object which iterate dictionary:
+            {
+                "field name": [value of the first item, value of the second item, ...]
+            }.
+
+        :raise ExtractError: If during execution it did not find any element that match
+            selector provided from the rule object.
+        :raise ParsingError: If parsing of scraping subject encounter unexpected error.
+        :raise FileNotFoundError: If the page_flag is "local" and the file was not found.
+        """
+        from .batch import column_batches, plan_items
+
+        parents = self._page_parents(body, page_flag, parser)
+        names = [field.name for field in self._plan.fields]
+        yield from column_batches(plan_items(parents, self._plan, batch_size, self.metrics), names, batch_size)
+
+    def write_extraction(
+            self,
+            body: Union[Bs, str, bytes],
+            page_flag: str,
+            sink,
+            batch_size: int = 1024,
+            parser: Optional[parser_name] = None
+    ) -> int:
+        """
+        Perform extraction and write the batches (see perform_batch_extraction) to a sink.
+        The batches are written once the whole page is extracted, so a page which fail, e.g.
+        in a pipeline, write nothing in the sink.
+
+        :param body: An object of either a BeautifulSoup object,
+            a string of local path or a string of html code.
+        :param page_flag: Flag of the "body" object, same as perform_extraction.
+        :param sink: Path of the output file, which format ("jsonl", "csv" or "parquet") is
+            taken from its extension, or a sink object with the method write(batch), e.g. one
+            returned by scraple.batch.open_sink to write many pages in the same file. A sink
+            object passed here is not closed.
+        :param batch_size: Maximum number of items written at a time.
+        :param parser: Override the parser of the extractor for this page.
+
+        :return: The number of items written.
+
+        :raise ExtractError: If during execution it did not find any element that match
+            selector provided from the rule object.
+        :raise ParsingError: If parsing of scraping subject encounter unexpected error.
+        :raise ValueError: If the format of the path is unknown.
+        :raise ImportError: If the format is "parquet" and pyarrow is not installed.
+        """
+        from .batch import open_sink
+
+        if isinstance(sink, (str, os.PathLike)):
+            with open_sink(os.fspath(sink)) as opened:
+                return self.write_extraction(body, page_flag, opened, batch_size, parser)
+        rows = 0
+        for batch in list(self.perform_batch_extraction(body, page_flag, batch_size, parser)):
+            sink.write(batch)
+            rows += len(next(iter(batch.values()), ()))
+        return rows
+
+    def perform_incremental_extraction(
+            self,
+            body: Union[Bs, str, bytes],
+            page_flag: str,
+            store,
+            page_key: Optional[str] = None,
+            key_field: Optional[Union[str, int]] = None,
+            parser: Optional[parser_name] = None
+    ) -> Generator["Change", None, None]:
+        """
+        Perform extraction and yield only the items added, changed or removed since the
+        last extraction of the page, see incremental.py. The pipelines are only run for the
+        added and changed items, and the new state is saved in the store before the first
+        change is yielded.
+
+        :param body: An object of either a BeautifulSoup object,
+            a string of local path or a string of html code.
+        :param page_flag: Flag of the "body" object, same as perform_extraction.
+        :param store: A scraple.incremental.StateStore keeping the items of the last extraction.
+        :param page_key: Key of the page in the store, e.g. its url. Default to the path for
+            a "local" page.
+        :param key_field: Name of the field which value identify an item, e.g. a link. If not
+            provided, an item is identified by the hash of its html.
+        :param parser: Override the parser of the extractor for this page.
+
+        :return: Generator object which iterate Change(status, key, item), status being
+            "added", "changed" or "removed" and item the dictionary of the item (field without
+            pipeline as html string), the last one extracted for a removed item.
+
+        :raise ExtractError: If during execution it did not find any element that match
+            selector provided from the rule object.
+        :raise ParsingError: If parsing of scraping subject encounter unexpected error.
+        :raise ValueError: If page_key is not provided for a page that is not "local".
+        :raise KeyError: If key_field is not a field of the rule.
+        """
+        from .incremental import item_changes
+
+        if page_key is None:
+            if page_flag.lower() != "local":
+                raise ValueError("page_key is required unless the page is a local path")
+            page_key = os.fspath(body)
+        parents = self._page_parents(body, page_flag, parser)
+        yield from item_changes(parents, self._plan, store, page_key, key_field, self.metrics)
+
+    def perform_streaming_extraction(
+            self,
+            source: Union[str, bytes, Iterable[Union[str, bytes]]],
+            page_flag: str,
+            iterate_parent_element_instead: bool = False,
+            encoding: Optional[str] = None
+    ) -> Generator[dict, None, None]:
+        """
+        Perform extraction while the page is being parsed, yielding every item as soon
+        as its parent element is closed. Each parent element is detached from the page once
+        extracted, so memory stay bounded by the size of an item rather than the whole page.
+
+        The page is always parsed by the builtin "html.parser". Parent elements nested in
+        another parent element are yielded before the outer one, and the extracted elements
+        do not have access to the rest of the page (their parent, siblings, ...).
+
+        :param source: A string of local path, a string or byte of html code, a file object
+            opened in binary or text mode, or an iterable of chunks (byte or string).
+        :param page_flag: Flag of the source, either "local" or "html" (used for the
+            last three kinds of source).
+        :param iterate_parent_element_instead: A flag, if you want to iterate the parent
+            element instead of dictionary.
+        :param encoding: Encoding used to decode byte of the source. If not provided, it is
+            taken from the byte order mark or the <meta> charset of the page as
+            perform_extraction do, utf-8 otherwise.
+
+        :return: Generator object which iterate dictionary, same as perform_extraction.
+
+        :raise ExtractError: If the whole page was parsed without finding any element that
+            match the rule.
+        :raise ParsingError: If parsing of the page encounter unexpected error, or the byte of
+            the page can not be decoded.
+        :raise FileNotFoundError: If the page_flag is "local" and the file was not found.
+        """
+        return stream_items(source, page_flag, self._plan, iterate_parent_element_instead, encoding)
+
+    def extract_many(
+            self,
+            pages: Iterable[Union[str, bytes]],
+            page_flag: str,
+            workers: Optional[int] = None,
+            chunksize: int = 1,
+            ordered: bool = True
+    ) -> Iterator[Tuple[int, list]]:
+        """
+        Perform extraction of many pages in parallel using a pool of processes.
+
+        The compiled rule is sent once to every worker process, then only the pages are
+        sent across. Because of that, pipeline function must be picklable (defined at
+        module level, not a lambda).
+
+        :param pages: Iterable of string of local path or of html code (byte or string).
+        :param page_flag: Flag of the pages, either "local" or "html".
+        :param workers: Number of worker process, default to the number of CPU.
+        :param chunksize: Number of pages sent to a worker at a time.
+        :param ordered: If False, results are yielded as soon as they are completed
+            instead of in the order of the pages.
+
+        :return: Iterator of tuple (index of the page in pages, [dictionary, ...]). The
+            dictionary are the same as perform_extraction, except that field without
+            pipeline contain list of html string of the elements instead of the elements,
+            and a page without element matching the rule give an empty list as with crawl.
+
+        :raise ParsingError: If parsing of a page encounter unexpected error, or the
+            page_flag is "parsed".
+        """
+        from .parallel import run_pool
+
+        if page_flag.lower() == 'parsed':
+            raise ParsingError(page_flag)
+        return run_pool(self._plan, self.parser, pages, page_flag, workers, chunksize, ordered)
+
+    def perform_extraction_concurrent(
+            self,
+            pages: Iterable[Union[Bs, str, bytes]],
+            page_flag: str,
+            threads: Optional[int] = None,
+            ordered: bool = True,
+            parser: Optional[parser_name] = None
+    ) -> Iterator[Tuple[int, list]]:
+        """
+        Perform extraction of many pages in parallel using a pool of threads sharing this
+        extractor. Unlike extract_many nothing is pickled, and the items are the same as
+        perform_extraction, but the pages run in parallel only where the GIL is released: while
+        parsing with "lxml", or with a free-threaded Python.
+
+        :param pages: Iterable of BeautifulSoup object, string of local path or html code.
+        :param page_flag: Flag of the pages, same as perform_extraction.
+        :param threads: Number of threads, default to the number of CPU.
+        :param ordered: If False, results are yielded as soon as they are completed
+            instead of in the order of the pages.
+        :param parser: Override the parser of the extractor for these pages.
+
+        :return: Iterator of tuple (index of the page in pages, [dictionary, ...]).
+
+        :raise ExtractError: If a page does not have any element that match the rule.
+        :raise ParsingError: If parsing of a page encounter unexpected error.
+        """
+        from .parallel import run_threads
+
+        return run_threads(partial(self._page_items, page_flag=page_flag, parser=parser), pages, threads, ordered)
+
+    def _page_items(self, body, page_flag, parser):
+        return list(self.perform_extraction(body, page_flag, parser=parser))
+
+    async def crawl(
+            self,
+            start_urls: Iterable[str],
+            follow: Optional[Union[Rules, RulIn, selector]] = None,
+            concurrency: int = 64,
+            transport=None,
+            executor=None,
+            max_pages: Optional[int] = None,
+            on_error: str = "raise"
+    ) -> AsyncIterator[Tuple[str, Union[list, Exception]]]:
+        """
+        Crawl the pages asynchronously, extract them and follow the link to the next page.
+
+        Pages are fetched concurrently by the transport, then parsed and extracted in the
+        executor so the event loop is never blocked. A page is crawled only once.
+
+        :param start_urls: Urls of the first pages.
+        :param follow: Rule of the link to follow in every page, e.g. a Rules defined with the
+            string "Next" of a pager. Either a Rules, a RulIn (its parent selector is used) or
+            a CSS selector. If the selected element is not a link, the first link inside it is
+            followed. With a Rules object, the ancestors of the element are also tried if the
+            element is not found.
+        :param concurrency: Maximum number of pages fetched at the same time.
+        :param transport: Object with the coroutine methods fetch(url) returning the page as
+            byte, and close(). Default to a pool of connection of aiohttp if it is installed,
+            or the builtin urllib otherwise. A transport passed here is not closed.
+        :param executor: Executor where pages are parsed and extracted, default to the
+            default executor of the event loop.
+        :param max_pages: Maximum number of pages to crawl.
+        :param on_error: What to do when a page can not be fetched (e.g. HTTP 404 or timeout)
+            or parsed: "raise" the error, which stop the crawl, "skip" the page, or "yield"
+            the tuple (url, error) instead of the items and go on.
+
+        :return: Asynchronous generator of tuple (url, [dictionary, ...]) in the order pages
+            are done. As with extract_many, field without pipeline contain list of html string,
+            and a page without element matching the rule give an empty list.
+
+        :raise ParsingError: If parsing of a page encounter unexpected error, with on_error "raise".
+        :raise Exception: The error of the transport (e.g. urllib.error.HTTPError) if a page
+            can not be fetched, with on_error "raise".
+        :raise ValueError: If on_error is not "raise", "skip" or "yield".
+        """
+        from .crawl import crawl_pages
+
+        if on_error not in ("raise", "skip", "yield"):
+            raise ValueError(f"unknown on_error {on_error!r}, expected 'raise', 'skip' or 'yield'")
+        if follow is None:
+            branches = []
+        elif isinstance(follow, Rules):
+            follow._ensure_reference()
+            branches = follow_branches(follow._parent, follow._tree)
+        else:
+            branches = [follow.parent if isinstance(follow, RulIn) else follow]
+        branches = [compile_selector(branch) for branch in branches]
+        async for result in crawl_pages(self._plan, self.parser, start_urls, branches, concurrency,
+                                        transport, executor, max_pages, on_error):
+            yield result
+
+
+class ExtractorGroup:
+    """
+    A class that extract several rules from a page parsed only once, the parent and field
+    elements of every rule being matched in a single traversal of the page.
+    """
+    def __init__(
+            self,
+            rules: Mapping[str, Union[Rules, RulIn, SimpleExtractor]],
+            parser: Optional[parser_name] = None,
+            metrics: Optional[Metrics] = None
+    ):
+        """
+        Instantiate the object with its extract rules.
+
+        :param rules: Dictionary of {"rule name": Rules, RulIn or SimpleExtractor object}. Of a
+            SimpleExtractor object only the rule and the metrics are used: the engine and the
+            template cache are not, the single traversal replacing them.
+        :param parser: Name of the beautifulsoup parser used for the page, or a sequence
+            of names in order of preference. If not provided, the parser of the first
+            Rules or SimpleExtractor object is used, "html.parser" otherwise.
+        :param metrics: A Metrics object to record the reading, parsing and traversal of the
+            pages, and the items and fields of the rules given as Rules or RulIn object. The
+            items and fields of a SimpleExtractor object are recorded in its own metrics.
+        """
+        if parser is None:
+            parser = next((rule._parser if isinstance(rule, Rules) else rule.parser for rule in rules.values()
+                           if isinstance(rule, (Rules, SimpleExtractor))), None)
+        self.parser = resolve_parser(parser)
+        self.metrics = metrics
+        self.extractors = {name: rule if isinstance(rule, SimpleExtractor) else SimpleExtractor(rule, self.parser, metrics)
+                           for name, rule in rules.items()}
+
+    def perform_extraction(
+            self,
+            body: Union[Bs, str, bytes],
+            page_flag: str,
+            iterate_parent_element_instead: bool = False
+    ) -> Dict[str, Generator[dict, None, None]]:
+        """
+        Perform extraction of every rule. The page is parsed once and the parent and field
+        elements of every rule are matched in a single traversal of the page (a field which
+        selector is not made of tag, classes and id only is still selected below every parent).
+
+        :param body: An object of either a BeautifulSoup object,
+            a string of local path or a string of html code.
+        :param page_flag: Flag of the "body" object, determine how the object
+            will be preprocessed.
+        :param iterate_parent_element_instead: A flag, if you want to iterate the parent
+            element instead of dictionary.
+
+        :return: Dictionary of {"rule name": generator}, each generator iterate the same
+            as SimpleExtractor.perform_extraction and raise ExtractError when iterated if the
+            page has no element that match the rule.
+
+        :raise ParsingError: If parsing of the page encounter unexpected error.
+        :raise FileNotFoundError: If the page_flag is "local" and the file was not found.
+        """
+        metrics = self.metrics
+        body = refine_body(body, page_flag, self.parser) if metrics is None \
+            else metered_body(body, page_flag, self.parser, metrics)
+        extractors = list(self.extractors.values())
+        with stage(metrics, "parent_select"):
+            parents, selected = group_items(body, [extractor._plan for extractor in extractors],
+                                            not iterate_parent_element_instead)
+        return {name: self._iterate(parents[number], selected[number], extractor, iterate_parent_element_instead)
+                for number, (name, extractor) in enumerate(self.extractors.items())}
+
+    @staticmethod
+    def _iterate(parents, selected, extractor, iterate_parent_element_instead):
+        if extractor.metrics is not None:
+            extractor.metrics.record_items(len(parents))
+        if len(parents) < 1:
+            raise ExtractError()
+        if iterate_parent_element_instead:
+            yield from parents
+        else:
+            yield from extract_items(parents, extractor._plan.fields, extractor.metrics, selected)
@@ -0,0 +1,156 @@
+"""
+Contain the function to generalize the selector of a rule into the minimal stable selector.
+
+The selector made from the reference name every tag, class and id of every element from the
+body down to the target element, so a class or id which differ from page to page (or from
+item to item) make the selector match only once, or nothing at all on the other pages.
+
+A class or id is stable if it appear in every reference page, an id of an element which has
+sibling elements of the same tag and classes (an item of a list) is never stable. Among the
+selectors made of the stable tag, class and id of the branch, the shortest one which match
+exactly the same elements as the whole stable branch on the reference is picked, the one
+with the rarest last element (the cheapest to match) first, then a class or id over a tag. The matching is done on a
+SelectorIndex of the reference, the elements of every tag, class and id of the page.
+"""
+from itertools import combinations
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+Compound = Tuple[str, ...]  # tokens of one element of the selector, e.g. ("div", ".quote")
+Chain = Tuple[Compound, ...]  # compounds from the top most element down, as "a b c"
+
+candidate_tokens = 4  # rarest tokens of an ancestor element tried in a selector
+
+
+def element_tokens(element) -> List[str]:
+    """Return the tag, classes and id of the element, e.g. ["div", ".quote", "#q1"]."""
+    tokens = [element.name]
+    if 'class' in element.attrs:
+        tokens.extend("." + class_ for class_ in element.attrs["class"])
+    if 'id' in element.attrs:
+        tokens.append("#" + element.attrs["id"])
+    return tokens
+
+
+def page_tokens(body) -> Set[str]:
+    """Return every tag, class and id of the page."""
+    tokens = set()
+    for element in body.find_all(True):
+        tokens.update(element_tokens(element))
+    return tokens
+
+
+class SelectorIndex:
+    """Elements of a Tree by tag, class and id, used to match selector made of them."""
+    def __init__(self, tree):
+        self.tree = tree
+        self.elements = {}  # token : set of element index
+        for idx, element in enumerate(tree.elements):
+            for token in element_tokens(element):
+                self.elements.setdefault(token, set()).add(idx)
+        self._size = [1] * len(tree)  # number of elements of the subtree of every element
+        for idx in range(len(tree) - 1, -1, -1):
+            if tree.parent[idx] != -1:
+                self._size[tree.parent[idx]] += self._size[idx]
+
+    def count(self, token: str) -> int:
+        return len(self.elements.get(token, ()))
+
+    def compound(self, tokens: Compound) -> Set[int]:
+        """Return the elements which have every token."""
+        found = set(self.elements.get(tokens[0], ()))
+        for token in tokens[1:]:
+            found &= self.elements.get(token, set())
+        return found
+
+    def match(self, chain: Chain) -> Set[int]:
+        """Return the elements matched by the selector of the chain, as soupsieve would."""
+        ancestors = [self.compound(tokens) for tokens in chain[:-1]]
+        found = self.compound(chain[-1])
+        if len(ancestors) < 1:
+            return found
+        parent = self.tree.parent
+        matched = set()
+        for idx in found:
+            level, idx_ = len(ancestors) - 1, parent[idx]
+            while idx_ != -1 and level >= 0:
+                if idx_ in ancestors[level]:
+                    level -= 1
+                idx_ = parent[idx_]
+            if level < 0:
+                matched.add(idx)
+        return matched
+
+    def below(self, elements: Iterable[int]) -> Set[int]:
+        """Return every element below the elements (not the elements themselves)."""
+        found = set()
+        for idx in elements:
+            found.update(range(idx + 1, idx + self._size[idx]))
+        return found
+
+    def stable_chain(self, idx: int, stop: int = -1, stable: Optional[Set[str]] = None) -> Tuple[Chain, bool]:
+        """
+        Return the chain of the stable tokens of the elements from below the ancestor of index
+        stop down to the element of the index, and whether every token was kept.
+
+        :param stable: Tokens of the other reference pages, the classes and ids not in it
+            are dropped. If not provided, only the id of repeated elements are dropped.
+        """
+        tree, chain, exact = self.tree, [], True
+        while idx != stop:
+            tokens = element_tokens(tree.elements[idx])
+            kept = [tokens[0]] + [token for token in tokens[1:]
+                                  if (stable is None or token in stable)
+                                  and not (token[0] == "#" and self._repeated(idx, tokens))]
+            exact = exact and len(kept) == len(tokens)
+            chain.append(tuple(kept))
+            idx = tree.parent[idx]
+        chain.reverse()
+        return tuple(chain), exact
+
+    def _repeated(self, idx: int, tokens: Sequence[str]) -> bool:
+        """Whether a sibling element has the same tag and classes."""
+        tree = self.tree
+        shape = [token for token in tokens if token[0] != "#"]
+        return any(sibling != idx and [token for token in element_tokens(tree.elements[sibling]) if token[0] != "#"] == shape
+                   for sibling in tree.children(tree.parent[idx]))
+
+    def minimal_selector(self, chain: Chain, within: Optional[Set[int]] = None) -> str:
+        """
+        Return the shortest selector which match the same elements as the chain, or the
+        selector of the whole chain if none of the candidates does.
+
+        :param within: Only compare the elements in it, e.g. the elements below the parent
+            elements for the selector of a field.
+        """
+        target = self.match(chain)
+        if within is not None:
+            target &= within
+        for candidate in self._candidates(chain):
+            found = self.match(candidate)
+            if within is not None:
+                found &= within
+            if len(found) == len(target):  # the candidate is part of the chain, so found contain target
+                return chain_selector(candidate)
+        return chain_selector(chain)
+
+    def _candidates(self, chain: Chain) -> List[Chain]:
+        last = chain[-1]
+        compounds = list(dict.fromkeys(
+            tokens for size in (1, 2, len(last)) for tokens in combinations(last, size)
+        ))
+        ancestors = list(dict.fromkeys(
+            (token,) for tokens in chain[:-1]
+            for token in sorted(tokens, key=self.count)[:candidate_tokens]
+        ))
+        candidates = [(tokens,) for tokens in compounds]
+        candidates += [(ancestor, tokens) for tokens in compounds for ancestor in ancestors]
+        costs = {tokens: len(self.compound(tokens)) for tokens in compounds}
+        return sorted(candidates, key=lambda candidate: (
+            # on a tie a class or id is preferred to a bare tag, which match any such element
+            sum(map(len, candidate)), costs[candidate[-1]], candidate[-1][-1][0] not in ".#",
+            self.count(candidate[0][0])
+        ))
+
+
+def chain_selector(chain: Chain) -> str:
+    return ' '.join(''.join(tokens) for tokens in chain)
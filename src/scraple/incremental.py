@@ -0,0 +1,130 @@
+"""
+Contain the change detection of a page extracted again and again, e.g. every hour.
+
+Every item of a page is keyed either by the value of a key field or by the hash of the html
+of its parent element, and the hash of its html is kept in a StateStore (a SQLite file) with
+the extracted item. When the page is extracted again, the pipelines are only run for the
+items which html changed or which are new, and only the added, changed and removed items are
+emitted. Without key field, an item which change is emitted as removed and added.
+"""
+import hashlib
+import json
+import sqlite3
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .parallel import plain_item
+from .plan import ExtractPlan, extract_items, field_elements
+
+added = "added"
+changed = "changed"
+removed = "removed"
+
+
+class Change(NamedTuple):
+    status: str  # "added", "changed" or "removed"
+    key: str
+    item: dict  # the new item, or the last one stored for a removed item
+
+
+class StateStore:
+    """
+    The items of every page extracted so far, in a SQLite file (or ":memory:"). A store can
+    be shared by several extractors as long as they do not use the same page key.
+    """
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "page TEXT NOT NULL, key TEXT NOT NULL, digest TEXT NOT NULL, item TEXT NOT NULL, "
+            "PRIMARY KEY (page, key))"
+        )
+        self._connection.commit()
+
+    def load(self, page: str) -> Dict[str, Tuple[str, str]]:
+        """Return {key: (digest, item as JSON)} of the items of the page."""
+        return {key: (digest, item) for key, digest, item in
+                self._connection.execute("SELECT key, digest, item FROM items WHERE page = ?", (page,))}
+
+    def replace(self, page: str, rows: List[Tuple[str, str, str]]) -> None:
+        """Replace the items of the page by the rows of (key, digest, item as JSON)."""
+        with self._connection:  # one transaction
+            self._connection.execute("DELETE FROM items WHERE page = ?", (page,))
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO items (page, key, digest, item) VALUES (?, ?, ?, ?)",
+                [(page, key, digest, item) for key, digest, item in rows]
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def subtree_digest(element) -> str:
+    """
+    Return the hash of the tags, attributes and strings of the element and its descendants,
+    computed from the tree directly as serializing the element to html is much slower.
+    """
+    parts = [element.name + repr(element.attrs)]
+    stack = [iter(element.contents)]
+    while stack:
+        for child in stack[-1]:
+            if child.name is None:
+                parts.append(child)
+            else:
+                parts.append("<" + child.name + repr(child.attrs) if child.attrs else "<" + child.name)
+                stack.append(iter(child.contents))
+                break
+        else:
+            stack.pop()
+            parts.append(">")
+    return hashlib.blake2b("\x00".join(parts).encode('utf8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def item_changes(parents: list, plan: ExtractPlan, store: StateStore, page: str,
+                 key_field: Optional[Union[str, int]] = None, metrics=None) -> List[Change]:
+    """
+    Return the changes of the items of the page since the state in the store, and save
+    the new state. The pipelines are only run for the added and changed items.
+
+    :raise KeyError: If the key field is not a field of the plan.
+    """
+    digests = [subtree_digest(parent) for parent in parents]
+    if key_field is None:
+        keys = digests
+    else:
+        field = next((field for field in plan.fields if field.name == key_field), None)
+        if field is None:
+            raise KeyError(key_field)
+        keys = [_key(field, parent) for parent in parents]
+
+    previous = store.load(page)
+    current, fresh = {}, []  # key : (digest, item as JSON or None), index of the parents to extract
+    for idx, (key, digest) in enumerate(zip(keys, digests)):
+        if key in current:  # an other item with the same key, keep the first
+            continue
+        stored = previous.get(key)
+        if stored is not None and stored[0] == digest:
+            current[key] = stored
+        else:
+            current[key] = digest, None
+            fresh.append(idx)
+
+    changes = []
+    for idx, item in zip(fresh, extract_items([parents[idx] for idx in fresh], plan.fields, metrics)):
+        key, item = keys[idx], plain_item(item)
+        current[key] = digests[idx], json.dumps(item, ensure_ascii=False, default=str)
+        changes.append(Change(changed if key in previous else added, key, item))
+    changes.extend(Change(removed, key, json.loads(item)) for key, (_, item) in previous.items() if key not in current)
+    store.replace(page, [(key, digest, item) for key, (digest, item) in current.items()])
+    return changes
+
+
+def _key(field, parent) -> str:
+    value = plain_item({field.name: field_elements(parent, field) if field.pipeline is None
+                        else field.pipeline(field_elements(parent, field))})[field.name]
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
@@ -0,0 +1,129 @@
+"""
+Contain the opt-in instrumentation of Rules and SimpleExtractor.
+
+A Metrics object passed to them record the duration of every stage of the work (reading
+the file, parsing, selecting the parent elements, building the text index, ...), the number
+of pages, items and bytes, and for every field the number of elements matched by its
+selector, the time of the selector and the time of its pipeline. Without a Metrics object
+nothing is recorded and the extraction run as usual.
+
+A Metrics object can be shared by extractions running in several threads, every record is
+done under a lock.
+
+To send the measures somewhere else (logging, a monitoring system, ...), subclass Metrics
+and override record_stage, record_page, record_items or record_field.
+"""
+from contextlib import contextmanager, nullcontext
+from threading import Lock
+from time import perf_counter
+from typing import List, Optional, Tuple, Union
+
+
+class StageMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+class FieldMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.matches = 0
+        self.select_seconds = 0.0
+        self.pipeline_seconds = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return self.select_seconds + self.pipeline_seconds
+
+
+class Metrics:
+    """Record per-stage durations, counts and bytes of every page, and per-field measures."""
+    def __init__(self):
+        self.pages = 0
+        self.items = 0
+        self.bytes = 0
+        self.stages = {}  # stage name : StageMetrics
+        self.fields = {}  # field name : FieldMetrics
+        self._lock = Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, perf_counter() - started)
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage_ = self.stages.get(name)
+            if stage_ is None:
+                stage_ = self.stages[name] = StageMetrics()
+            stage_.calls += 1
+            stage_.seconds += seconds
+
+    def record_page(self, bytes_: int) -> None:
+        with self._lock:
+            self.pages += 1
+            self.bytes += bytes_
+
+    def record_items(self, items: int) -> None:
+        with self._lock:
+            self.items += items
+
+    def record_field(self, name: Union[str, int], matches: int, select_seconds: float,
+                     pipeline_seconds: float) -> None:
+        with self._lock:
+            field = self.fields.get(name)
+            if field is None:
+                field = self.fields[name] = FieldMetrics()
+            field.calls += 1
+            field.matches += matches
+            field.select_seconds += select_seconds
+            field.pipeline_seconds += pipeline_seconds
+
+    def slowest_fields(self, top: Optional[int] = 5) -> List[Tuple[Union[str, int], FieldMetrics]]:
+        """Return the fields sorted by their total time (selector and pipeline), slowest first."""
+        with self._lock:
+            fields = list(self.fields.items())
+        fields.sort(key=lambda field: field[1].seconds, reverse=True)
+        return fields if top is None else fields[:top]
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "items": self.items,
+                "bytes": self.bytes,
+                "stages": {name: {"calls": stage_.calls, "seconds": stage_.seconds}
+                           for name, stage_ in self.stages.items()},
+                "fields": {str(name): {"calls": field.calls, "matches": field.matches,
+                                       "select_seconds": field.select_seconds,
+                                       "pipeline_seconds": field.pipeline_seconds}
+                           for name, field in self.fields.items()},
+            }
+
+    def report(self, top: Optional[int] = 5) -> str:
+        """Return a table of the stages and of the slowest fields."""
+        lines = [f"pages: {self.pages}, items: {self.items}, bytes: {self.bytes}", "",
+                 f"{'stage':<20}{'calls':>8}{'total s':>12}{'mean ms':>12}"]
+        with self._lock:
+            stages = list(self.stages.items())
+        for name, stage_ in sorted(stages, key=lambda item: item[1].seconds, reverse=True):
+            lines.append(f"{name:<20}{stage_.calls:>8}{stage_.seconds:>12.4f}"
+                         f"{stage_.seconds / stage_.calls * 1000:>12.3f}")
+        if self.fields:
+            lines += ["", f"{'slowest field':<20}{'matches':>8}{'select s':>12}{'pipeline s':>12}"]
+            for name, field in self.slowest_fields(top):
+                lines.append(f"{str(name)[:19]:<20}{field.matches:>8}{field.select_seconds:>12.4f}"
+                             f"{field.pipeline_seconds:>12.4f}")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.report()
+
+
+def stage(metrics: Optional[Metrics], name: str):
+    """Context manager timing the stage if metrics is provided, doing nothing otherwise."""
+    return metrics.stage(name) if metrics is not None else nullcontext()
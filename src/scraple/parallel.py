@@ -0,0 +1,112 @@
+"""
+Contain the function to run an extraction plan over many pages with a pool of processes,
+or an extractor over many pages with a pool of threads.
+
+The plan is sent once to every worker process when the pool start, after that only the
+pages (path or html code) are sent to the worker and plain dictionaries are sent back.
+The threads share the extractor itself, which is immutable, the pages are parsed in the
+threads so a parser releasing the GIL (lxml) or a free-threaded Python run them in parallel.
+"""
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from .extract import refine_body
+from .plan import ExtractPlan, extract_items, find_items
+
+_worker_plan = None
+_worker_parser = None
+
+
+def _init_worker(plan: ExtractPlan, parser: str) -> None:
+    global _worker_plan, _worker_parser
+    _worker_plan, _worker_parser = plan, parser
+
+
+def plain_item(extracted: dict) -> dict:
+    """Turn list of elements (field without pipeline) into list of html string."""
+    for key, value in extracted.items():
+        if isinstance(value, list) and any(hasattr(element, 'name') for element in value):
+            extracted[key] = [str(element) for element in value]
+    return extracted
+
+
+def extract_page(body, page_flag: str, plan: ExtractPlan, parser: str) -> list:
+    """Return the plain items of the page, an empty list if no element match the rule."""
+    body = refine_body(body, page_flag, parser)
+    parents, selected = find_items(body, plan)
+    return [plain_item(item) for item in extract_items(parents, plan.fields, selected=selected)]
+
+
+def _extract_chunk(chunk: list, page_flag: str) -> list:
+    return [(idx, extract_page(page, page_flag, _worker_plan, _worker_parser)) for idx, page in chunk]
+
+
+def _chunks(pages: Iterable, chunksize: int) -> Iterator[list]:
+    pages = enumerate(pages)
+    chunk = list(islice(pages, chunksize))
+    while chunk:
+        yield chunk
+        chunk = list(islice(pages, chunksize))
+
+
+def run_pool(
+        plan: ExtractPlan,
+        parser: str,
+        pages: Iterable,
+        page_flag: str,
+        workers: Optional[int] = None,
+        chunksize: int = 1,
+        ordered: bool = True
+) -> Iterator[Tuple[int, list]]:
+    """
+    Extract every page with a pool of processes, only a bounded number of chunk is
+    submitted at a time so the pages iterable is consumed lazily.
+
+    :return: Iterator of (index of the page, list of extracted dictionary).
+    """
+    chunksize = max(1, chunksize)
+    workers = workers if workers is not None and workers > 0 else os.cpu_count() or 1
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(plan, parser)) as executor:
+        yield from _bounded(executor, _extract_chunk, (page_flag,), pages, chunksize, workers * 2, ordered)
+
+
+def run_threads(
+        extract: Callable[[object], list],
+        pages: Iterable,
+        threads: Optional[int] = None,
+        ordered: bool = True
+) -> Iterator[Tuple[int, list]]:
+    """
+    Extract every page with a pool of threads calling extract(page), only a bounded number of
+    page is submitted at a time so the pages iterable is consumed lazily.
+
+    :return: Iterator of (index of the page, list of extracted dictionary).
+    """
+    threads = threads if threads is not None and threads > 0 else os.cpu_count() or 1
+    with ThreadPoolExecutor(threads) as executor:
+        yield from _bounded(executor, _extract_thread_chunk, (extract,), pages, 1, threads * 2, ordered)
+
+
+def _extract_thread_chunk(chunk: list, extract: Callable) -> list:
+    return [(idx, extract(page)) for idx, page in chunk]
+
+
+def _bounded(executor: Executor, function: Callable, args: tuple, pages: Iterable, chunksize: int,
+             max_pending: int, ordered: bool) -> Iterator[Tuple[int, list]]:
+    """Submit function(chunk, *args) for every chunk of pages, at most max_pending at a time."""
+    chunks = _chunks(pages, chunksize)
+    pending = deque(executor.submit(function, chunk, *args) for chunk in islice(chunks, max_pending))
+    while pending:
+        if ordered:
+            done = [pending.popleft()]
+        else:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+        for future in done:
+            yield from future.result()
+        for chunk in islice(chunks, len(done)):
+            pending.append(executor.submit(function, chunk, *args))
@@ -4,9 +4,16 @@ Contain simple generic function as pipeline to process elements extracted.
 The library utilize mostly beautifulsoup.select() method to retrieve elements which is why all the
 function in this module take a list of element object. You shall abide to this rule if you want to
 pass custom pipeline processor when defining Rules.
+
+Every builtin pipeline also have a batch version in batch_pipelines, used by the extractor
+to process a field of all the items of a page in one call. It take the list of elements of
+every item and a TextIndex of the page, so the text of an element is sliced from a text
+computed once instead of walking the subtree of the element again.
 """
 
-from typing import Union, TypeAlias
+from typing import Callable, Dict, List, Union, TypeAlias
+
+from .TreeCore import TextIndex
 List_of_Elements: TypeAlias = list
 
 
@@ -15,6 +22,11 @@ def text(elements: List_of_Elements) -> str:
     return strings
 
 
+def clean_text(elements: List_of_Elements) -> str:
+    """Same as text, but every run of whitespace is replaced by a single space."""
+    return " ".join(" ".join(element.text.split()) for element in elements)
+
+
 def tags(elements: List_of_Elements, return_str=False) -> Union[str, list]:
     tag = ""
     if len(elements) > 0:
@@ -30,3 +42,30 @@ def link(elements: List_of_Elements) -> str:
         if link_ is not None:
             return link_
     return ""
+
+
+def text_batch(items: List[List_of_Elements], index: TextIndex) -> list:
+    text_ = index.text
+    return [" ".join([text_(element).strip() for element in elements]) for elements in items]
+
+
+def clean_text_batch(items: List[List_of_Elements], index: TextIndex) -> list:
+    text_ = index.text
+    return [" ".join(" ".join(text_(element).split()) for element in elements) for elements in items]
+
+
+def tags_batch(items: List[List_of_Elements], index: TextIndex) -> list:
+    text_ = index.text
+    return [[text_(element).strip() for element in elements] if len(elements) > 0 else "" for elements in items]
+
+
+def link_batch(items: List[List_of_Elements], index: TextIndex) -> list:
+    return [link(elements) for elements in items]
+
+
+batch_pipelines: Dict[Callable, Callable] = {
+    text: text_batch,
+    clean_text: clean_text_batch,
+    tags: tags_batch,
+    link: link_batch,
+}
@@ -0,0 +1,370 @@
+"""
+Contain the compiled form of an extraction rule.
+
+SimpleExtractor compile its rule once into an ExtractPlan so the selector of the parent
+and every field are parsed by soupsieve only one time, and the pipeline of every field is
+already resolved to a callable. Extracting an item is then just matching and calling pipeline.
+
+When the items of a page are extracted, a field which pipeline has a batch version (see
+pipeline.batch_pipelines) is processed for a chunk of items in one call sharing a TextIndex
+of the chunk, instead of calling the pipeline item by item.
+
+A plan compiled with the structural paths recorded by Rules (the "path" engine of
+SimpleExtractor) find the parent elements and the field elements by walking down the child
+elements with the recorded "tag.class#id" of every level, instead of matching the selector
+against every element of the subtree. The selector is used when the structure of the page
+differ: nothing is found at the path, or an element which is not at the path match the
+selector. This is checked in one walk of the page for the parents and every field of every
+parent (one walk of the item for an item extracted alone), only the elements with the tag,
+classes and id of the last compound of a selector are looked at, and matched against the
+selector if they are not at the path below the parents containing them.
+"""
+import re
+from functools import lru_cache
+from itertools import islice
+from time import perf_counter
+from typing import Iterator, NamedTuple, Optional, Callable, Sequence, Tuple, Union
+
+import soupsieve as sv
+
+from .TreeCore import TextIndex, node_constructor
+from .Tree_search_engine import parent_elements
+from .metrics import stage
+from .pipeline import batch_pipelines
+
+
+Path = Tuple[str, ...]  # node ("tag.class#id") of every step
+item_chunk_size = 256  # items extracted at a time by a batch pipeline
+
+
+class FieldPlan(NamedTuple):
+    name: Union[str, int]
+    selector: Optional[sv.SoupSieve]  # None mean the field is the parent element itself
+    pipeline: Optional[Callable]
+    batch: Optional[Callable] = None  # batch version of the pipeline, if any
+    path: Optional[Path] = None  # path below the parent element
+
+
+class ExtractPlan(NamedTuple):
+    parent: sv.SoupSieve
+    fields: Tuple[FieldPlan, ...]
+    parent_path: Optional[Path] = None  # path below the body
+
+
+def compile_selector(selector_: str) -> Optional[sv.SoupSieve]:
+    return sv.compile(selector_) if selector_.strip() != "" else None
+
+
+def compile_plan(parent: str, fields: dict, parent_path: Optional[Path] = None,
+                 field_paths: Optional[dict] = None) -> ExtractPlan:
+    """
+    Compile the parent selector and the field rule (as in RulIn) into an ExtractPlan.
+
+    :param parent: The parent selector.
+    :param fields: Dictionary of {"field name": (selector, pipeline)}.
+    :param parent_path: Path of the parent elements below the body, if they are to be found
+        by their path.
+    :param field_paths: Dictionary of {"field name": path below the parent element}, for the
+        fields to be found by their path.
+    """
+    field_paths = field_paths or {}
+    return ExtractPlan(
+        sv.compile(parent),
+        tuple(FieldPlan(key, compile_selector(selector_), pipeline, batch_pipelines.get(pipeline),
+                        _as_path(field_paths.get(key)))
+              for key, (selector_, pipeline) in fields.items()),
+        _as_path(parent_path)
+    )
+
+
+def _as_path(path) -> Optional[Path]:
+    return tuple(path) if path else None
+
+
+def path_select(element, path: Path, limit: Optional[int] = None) -> Optional[list]:
+    """
+    Return the elements at the path below element, following at every step the child
+    elements with the node of the step (as the child combinator "a > b" would). Return None if
+    there is none, i.e. the structure differ.
+
+    :param limit: Stop once that many elements are found at the last step.
+    """
+    found = [element]
+    for step, node in enumerate(path, 1):
+        name = node.split(".", 1)[0].split("#", 1)[0]
+        matches = (child for element in found for child in element.contents
+                   if child.name == name and node_constructor(child) == node)
+        found = list(islice(matches, limit) if step == len(path) and limit is not None else matches)
+        if len(found) < 1:
+            return None
+    return found
+
+
+def find_parents(body, plan: ExtractPlan, limit: Optional[int] = None) -> Sequence:
+    """Return the parent elements of the page, only the first limit ones if provided."""
+    if plan.parent_path is not None and limit is None:  # with a limit the selector stop early anyway
+        check = _parent_check(plan)
+        parents = path_select(body, plan.parent_path) if check is not None else None
+        if parents is not None and _misplaced(body, [check], {id(parent): 0 for parent in parents}) is not None:
+            return parents
+    if limit is None:
+        return parent_elements(body, plan.parent)
+    return plan.parent.select(body, limit) if limit > 0 else []  # select stop matching at the limit
+
+
+def find_items(body, plan: ExtractPlan, limit: Optional[int] = None) -> Tuple[Sequence, Optional[list]]:
+    """
+    Return the parent elements of the page as find_parents, and the elements of every field
+    of every parent (as extract_items selected parameter) if the parents were found by their
+    path, None otherwise. The parent and field elements found at the paths are all checked
+    in one walk of the page, instead of one walk of every parent.
+    """
+    check = _parent_check(plan) if plan.parent_path is not None and limit is None else None
+    parents = path_select(body, plan.parent_path) if check is not None else None
+    if parents is None:
+        return find_parents(body, plan, limit), None
+    indexes = {id(parent): index for index, parent in enumerate(parents)}
+    checks = _field_checks(plan.fields)
+    misplaced = _misplaced(body, [check, *checks], indexes)
+    if misplaced is None:
+        return parent_elements(body, plan.parent), None
+    checked = {check_[0] for check_ in checks}
+    return parents, [[_checked_elements(parent, field, (position, index), position in checked, misplaced)
+                      for index, parent in enumerate(parents)] for position, field in enumerate(plan.fields)]
+
+
+def group_items(body, plans: Sequence[ExtractPlan], fields: bool = True) -> Tuple[list, list]:
+    """
+    Return the parent elements of every plan, and the elements of every field of every parent
+    (as extract_items selected parameter) if fields is True, matched in a single walk of the
+    page. A field element is matched when the walk reach it, if it has the tag, classes and id
+    of the last compound of the selector, and added to the parents containing it. A field which
+    selector is made of anything else is selected below every parent after the walk.
+    """
+    parents, indexes = [[] for _ in plans], [{} for _ in plans]  # indexes: id of the parent : index
+    selected = [[[] for _ in plan.fields] for plan in plans]
+    by_tag, anywhere, walked = {}, [], set()
+    for number, plan in enumerate(plans):
+        for position, field in enumerate(plan.fields):
+            compound = _last_compound(field.selector.pattern) if fields and field.selector is not None else None
+            if compound is not None:
+                check = number, position, field.selector, compound[1], compound[2]
+                (anywhere if compound[0] is None else by_tag.setdefault(compound[0], [])).append(check)
+                walked.add((number, position))
+    for element in body.descendants:
+        if element.name is None:
+            continue
+        for number, plan in enumerate(plans):
+            if plan.parent.match(element):
+                indexes[number][id(element)] = len(parents[number])
+                parents[number].append(element)
+                for column in selected[number]:
+                    column.append([])
+        candidates = by_tag.get(element.name, ())
+        if anywhere:
+            candidates = [*candidates, *anywhere]
+        for number, position, selector, classes, id_ in candidates:
+            attrs = element.attrs
+            if (classes and not classes.issubset(attrs.get('class', ()))) or (id_ is not None and attrs.get('id') != id_):
+                continue
+            if not indexes[number] or not selector.match(element):
+                continue
+            ancestor = element.parent
+            while ancestor is not None and ancestor is not body:
+                index = indexes[number].get(id(ancestor))
+                if index is not None:
+                    selected[number][position][index].append(element)
+                ancestor = ancestor.parent
+    if fields:
+        for number, plan in enumerate(plans):
+            for position, field in enumerate(plan.fields):
+                if (number, position) not in walked:
+                    selected[number][position] = [_select(parent, field) for parent in parents[number]]
+    return parents, selected
+
+
+def item_elements(item, fields: Tuple[FieldPlan, ...]) -> list:
+    """
+    Return the elements of every field of the item. The fields found by their path are all
+    checked in one walk of the item.
+    """
+    checks = _field_checks(fields)
+    if len(checks) < 1:
+        return [_select(item, field) for field in fields]
+    misplaced = _misplaced(item, checks, {id(item): 0})
+    checked = {check[0] for check in checks}
+    return [_checked_elements(item, field, (position, 0), position in checked, misplaced)
+            for position, field in enumerate(fields)]
+
+
+def select_items(items: Sequence, fields: Tuple[FieldPlan, ...]) -> list:
+    """Return the elements of every field of every item, as extract_items selected parameter."""
+    return [list(column) for column in zip(*(item_elements(item, fields) for item in items))] or [[] for _ in fields]
+
+
+def field_elements(item, field: FieldPlan) -> list:
+    return item_elements(item, (field,))[0]
+
+
+def _select(item, field: FieldPlan) -> list:
+    return [item] if field.selector is None else field.selector.select(item)
+
+
+def _checked_elements(item, field: FieldPlan, key: tuple, checked: bool, misplaced: set) -> list:
+    """The elements at the path of the field, unless an element at another place match its selector."""
+    if checked and key not in misplaced:
+        found = path_select(item, field.path)
+        if found is not None:
+            return found
+    return _select(item, field)
+
+
+def _parent_check(plan: ExtractPlan) -> Optional[tuple]:
+    compound = _last_compound(plan.parent.pattern)
+    return None if compound is None else (None, plan.parent, None, *compound)
+
+
+def _field_checks(fields: Tuple[FieldPlan, ...]) -> list:
+    """
+    Return (position, selector, path, tag, classes, id) of the fields with a path, which
+    selector is made of tag, classes and id only (the other fields always use the selector).
+    """
+    checks = []
+    for position, field in enumerate(fields):
+        if field.path is not None and field.selector is not None:
+            compound = _last_compound(field.selector.pattern)
+            if compound is not None:
+                checks.append((position, field.selector, field.path, *compound))
+    return checks
+
+
+def _misplaced(root, checks: list, parents: dict) -> Optional[set]:
+    """
+    Walk the elements below root once, and return the (position of the field, index of the
+    parent) of every field having an element below a parent, which is not at the path of the
+    field but match its selector (e.g. an element at another depth). Only the elements with
+    the tag, classes and id of the last compound of a selector are matched, a parent which
+    does not contain such element is not checked further.
+
+    :param checks: The checks of _field_checks, and the one of _parent_check which path is
+        None: an element which is not a parent must not match the parent selector.
+    :param parents: Dictionary of {id of the parent element: index}.
+
+    :return: The set, or None if an element which is not a parent match the parent selector.
+    """
+    by_tag, anywhere = {}, []
+    for check in checks:
+        if check[3] is None:
+            anywhere.append(check)
+        else:
+            by_tag.setdefault(check[3], []).append(check)
+    misplaced = set()
+    for element in root.descendants:
+        if element.name is None:
+            continue
+        candidates = by_tag.get(element.name, ())
+        if anywhere:
+            candidates = [*candidates, *anywhere]
+        for position, selector, path, _, classes, id_ in candidates:
+            attrs = element.attrs
+            if (classes and not classes.issubset(attrs.get('class', ()))) or (id_ is not None and attrs.get('id') != id_):
+                continue
+            if path is None:
+                if id(element) not in parents and selector.match(element):
+                    return None
+            else:
+                misplaced.update((position, index) for index in _outside_path(element, root, path, parents, selector))
+    return misplaced
+
+
+def _outside_path(element, root, path: Path, parents: dict, selector: sv.SoupSieve) -> list:
+    """Return the index of the parents containing the element not at the path below them, if it match the selector."""
+    indexes, nodes, matched = [], [element], None
+    ancestor = element
+    while ancestor is not root:
+        ancestor = ancestor.parent
+        index = parents.get(id(ancestor))
+        if index is not None and not (len(nodes) == len(path) and
+                                      all(node_constructor(node) == step for node, step in zip(reversed(nodes), path))):
+            if matched is None:
+                matched = selector.match(element)
+            if not matched:
+                return []
+            indexes.append(index)
+        nodes.append(ancestor)
+    return indexes
+
+
+@lru_cache(maxsize=None)
+def _last_compound(pattern: str) -> Optional[Tuple[Optional[str], frozenset, Optional[str]]]:
+    """Return the tag, classes and id of the last compound of a selector made of them only."""
+    if ',' in pattern:
+        return None
+    last = re.split(r'[\s>+~]+', pattern.strip())[-1]
+    match = re.fullmatch(r'([\w-]*)((?:[.#][\w-]+)*)', last)
+    if match is None:
+        return None
+    tokens = re.findall(r'[.#][\w-]+', match.group(2))
+    ids = [token[1:] for token in tokens if token[0] == '#']
+    if len(ids) > 1:
+        return None
+    return (match.group(1).lower() or None, frozenset(token[1:] for token in tokens if token[0] == '.'),
+            ids[0] if ids else None)
+
+
+def extract_item(item, fields: Tuple[FieldPlan, ...]) -> dict:
+    extracted = {}
+    for field, child in zip(fields, item_elements(item, fields)):
+        extracted[field.name] = child if field.pipeline is None else field.pipeline(child)
+    return extracted
+
+
+def extract_items(items: Sequence, fields: Tuple[FieldPlan, ...], metrics=None, selected=None,
+                  chunk_size: int = item_chunk_size) -> Iterator[dict]:
+    """
+    Yield the items one by one as extract_item called on every item would. When a field has
+    a batch pipeline, or the metrics or selected elements are provided, the items are
+    extracted chunk_size items at a time, so the first items are yielded before the
+    following ones are extracted.
+
+    :param metrics: A metrics.Metrics object to record the matches, selector time and
+        pipeline time of every field, if provided.
+    :param selected: The elements of every field (in the order of fields) of every item,
+        e.g. replayed by a template.TemplateCache, used instead of matching the fields.
+    """
+    if metrics is None and selected is None and all(field.batch is None for field in fields):
+        for item in items:
+            yield extract_item(item, fields)
+        return
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        chunk_selected = None if selected is None else [field[start:start + chunk_size] for field in selected]
+        yield from _extract_chunk(chunk, fields, metrics, chunk_selected)
+
+
+def _extract_chunk(items: Sequence, fields: Tuple[FieldPlan, ...], metrics, selected) -> list:
+    if selected is None and len(_field_checks(fields)) > 0:  # the fields at a path are checked in one walk of every item
+        with stage(metrics, "field_select"):
+            selected = select_items(items, fields)
+    index = None
+    if any(field.batch is not None for field in fields):
+        with stage(metrics, "text_index"):
+            index = TextIndex(items)
+    names, columns = [], []
+    for position, field in enumerate(fields):
+        started = perf_counter()
+        children = [field_elements(item, field) for item in items] if selected is None else selected[position]
+        matched = perf_counter()
+        columns.append(_column(children, field.pipeline, field.batch, index))
+        if metrics is not None:
+            metrics.record_field(field.name, sum(map(len, children)), matched - started, perf_counter() - matched)
+        names.append(field.name)
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _column(children, pipeline, batch, index):
+    if pipeline is None:
+        return children
+    if batch is not None:
+        return batch(children, index)
+    return [pipeline(child) for child in children]
@@ -0,0 +1,417 @@
+"""
+Contain the runner extracting a saved rule over a large corpus of pages on disk, a directory
+(compressed pages are decompressed) or a tar or zip archive of pages.
+
+The corpus is walked once, by the process calling run, in the order of the directory entries
+(a directory is listed while it is walked, never held in memory) or of the archive members.
+Page i goes to shard i % shards and shard s is written by the worker process s % workers,
+every page is handed to its worker through a bounded queue: the path of a local page or the
+name of a zip member, which the worker read itself, or the bytes of a tar member as a
+compressed tar can only be read in order, so it is decompressed once. The memory used is then
+bounded by the queues, whatever the size of the corpus.
+
+A shard write its items into part files of at most checkpoint_every pages each, and after
+every part it save a checkpoint (pages done, rows, errors, name of the last page). A run
+started again with the same output resume every shard after its last checkpoint: the pages
+already done are not handed again, and the part not recorded in the checkpoint is discarded
+and extracted again. The corpus must be unchanged, a resumed run stop if the last page of a
+checkpoint is not at the same place in the corpus.
+
+A page which fail (ExtractError, ParsingError or any other error) is counted by error type in
+the checkpoint of its shard and logged in the failures file of the shard, the run go on.
+
+    python -m scraple.runner rule.json pages/ output/ --workers 8 --format parquet
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import tarfile
+import time
+import zipfile
+from collections import Counter
+from functools import partial
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .batch import open_sink, sinks
+from .extract import RulIn, SimpleExtractor
+from .source import decompress
+
+manifest_name = "run.json"
+queue_size = 64  # pages waiting for every worker
+
+
+class ShardReport(NamedTuple):
+    shard: int
+    pages: int
+    rows: int
+    errors: dict  # error type name : count
+    seconds: float  # time spent extracting the pages of the shard
+    complete: bool
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds > 0 else 0.0
+
+
+def corpus_kind(corpus: str) -> str:
+    """
+    Return "directory", "zip" or "tar".
+
+    :raise ValueError: If the corpus is not a directory, a tar or a zip archive.
+    """
+    if os.path.isdir(corpus):
+        return "directory"
+    if zipfile.is_zipfile(corpus):
+        return "zip"
+    if tarfile.is_tarfile(corpus):
+        return "tar"
+    raise ValueError(f"{corpus!r} is not a directory, a tar or a zip archive")
+
+
+def iter_corpus(corpus: str) -> Iterator[Tuple[str, Optional[Callable[[], bytes]]]]:
+    """
+    Yield (name, read) of every page of the corpus in its order. For a tar member read()
+    return its bytes and must be called before the next page, a page of a directory or zip
+    archive is read by its name instead (read is None).
+
+    :raise ValueError: If the corpus is not a directory, a tar or a zip archive.
+    """
+    kind = corpus_kind(corpus)
+    if kind == "directory":
+        for path in _walk(corpus):
+            yield os.path.relpath(path, corpus), None
+    elif kind == "zip":
+        with zipfile.ZipFile(corpus) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, None
+    else:
+        with tarfile.open(corpus, "r|*") as archive:  # streamed, members are read in order
+            for member in archive:
+                if member.isfile():
+                    yield member.name, lambda member=member: archive.extractfile(member).read()
+                archive.members = []  # the members are kept by tarfile otherwise
+
+
+def _walk(root: str) -> Iterator[str]:
+    """Yield the path of every file below root, in the order of the directory entries."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif entry.is_file():
+                yield entry.path
+
+
+def _shard_name(output: str, shard: int, suffix: str) -> str:
+    return os.path.join(output, f"shard-{shard:05d}{suffix}")
+
+
+def _load_checkpoint(output: str, shard: int) -> dict:
+    path = _shard_name(output, shard, ".checkpoint.json")
+    if not os.path.exists(path):
+        return {"pages": 0, "parts": 0, "rows": 0, "errors": {}, "failures_size": 0, "seconds": 0.0,
+                "last_page": None, "complete": False}
+    with open(path, encoding="utf8") as file:
+        return json.load(file)
+
+
+def _save_checkpoint(output: str, shard: int, state: dict) -> None:
+    path = _shard_name(output, shard, ".checkpoint.json")
+    with open(path + ".tmp", "w", encoding="utf8") as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)  # a crash leave either the old or the new checkpoint
+
+
+def _discard_unsaved(output: str, shard: int, state: dict, format_: str) -> None:
+    """Remove the part files and failures written after the last checkpoint."""
+    prefix = os.path.basename(_shard_name(output, shard, "-part-"))
+    for name in os.listdir(output):
+        if name.startswith(prefix) and name.endswith("." + format_) \
+                and int(name[len(prefix):-len(format_) - 1]) >= state["parts"]:
+            os.remove(os.path.join(output, name))
+    failures = _shard_name(output, shard, ".failures.jsonl")
+    if os.path.exists(failures):
+        with open(failures, "r+b") as file:
+            file.truncate(state["failures_size"])
+
+
+class _ShardWriter:
+    """The part files, failures and checkpoints of one shard, in its worker process."""
+    def __init__(self, output: str, shard: int, format_: str, checkpoint_every: int, batch_size: int):
+        self.output, self.shard, self.format_ = output, shard, format_
+        self.checkpoint_every, self.batch_size = max(1, checkpoint_every), batch_size
+        self.state = _load_checkpoint(output, shard)
+        _discard_unsaved(output, shard, self.state, format_)
+        self._failures = open(_shard_name(output, shard, ".failures.jsonl"), "ab")
+        self._sink, self._pages, self._rows, self._errors, self._seconds = None, 0, 0, Counter(), 0.0
+        self._last_page = self.state.get("last_page")
+
+    def write(self, extractor: SimpleExtractor, name: str, load: Callable[[], Tuple[Union[str, bytes], str]]) -> None:
+        if self._sink is None:
+            self._sink = open_sink(_shard_name(self.output, self.shard, f"-part-{self.state['parts']:05d}.{self.format_}"),
+                                   self.format_)
+        started = time.perf_counter()
+        try:
+            self._rows += extractor.write_extraction(*load(), self._sink, self.batch_size)
+        except Exception as error:  # a bad page does not stop the run, it is reported
+            self._errors[type(error).__name__] += 1
+            self._failures.write((json.dumps({"page": name, "error": type(error).__name__, "message": str(error)},
+                                             ensure_ascii=False) + "\n").encode("utf8"))
+        self._seconds += time.perf_counter() - started
+        self._pages += 1
+        self._last_page = name
+        if self._pages == self.checkpoint_every:
+            self.checkpoint(False)
+
+    def checkpoint(self, complete: bool) -> None:
+        if self._sink is not None:
+            self._sink.close()
+            self.state["parts"] += 1
+            self._sink = None
+        self._failures.flush()
+        state = self.state
+        state.update(pages=state["pages"] + self._pages, rows=state["rows"] + self._rows,
+                     failures_size=self._failures.tell(), errors=dict(Counter(state["errors"]) + self._errors),
+                     seconds=state["seconds"] + self._seconds, last_page=self._last_page, complete=complete)
+        _save_checkpoint(self.output, self.shard, state)
+        self._pages, self._rows, self._errors, self._seconds = 0, 0, Counter(), 0.0
+
+    def close(self) -> ShardReport:
+        self.checkpoint(True)
+        self._failures.close()
+        return _report(self.shard, self.state)
+
+
+def _work(pages, reports, shards: List[int], corpus: str, kind: str, rule: RulIn, output: str, format_: str,
+          parser: Optional[str], engine: str, checkpoint_every: int, batch_size: int) -> None:
+    """Worker process, write the pages of its shards handed through the pages queue until None."""
+    extractor = SimpleExtractor(rule, parser, engine=engine)
+    writers = {shard: _ShardWriter(output, shard, format_, checkpoint_every, batch_size) for shard in shards}
+    archive = zipfile.ZipFile(corpus) if kind == "zip" else None
+    try:
+        for shard, name, data in iter(partial(_next_page, pages), None):
+            if kind == "directory":
+                load = lambda path=os.path.join(corpus, name): (path, "local")
+            elif kind == "zip":
+                load = lambda name=name: (decompress(archive.read(name)), "html")
+            else:
+                load = lambda data=data: (decompress(data), "html")
+            writers[shard].write(extractor, name, load)
+    finally:
+        if archive is not None:
+            archive.close()
+    reports.put([writer.close() for writer in writers.values()])
+
+
+def _next_page(pages):
+    """
+    Return the next message of the queue. The worker exit, without checkpoint, if the process
+    running it is gone (e.g. killed) instead of waiting for pages forever.
+    """
+    parent = multiprocessing.parent_process()
+    while parent is None or parent.is_alive():
+        try:
+            return pages.get(timeout=1.0)
+        except queue.Empty:
+            pass
+    raise SystemExit(1)
+
+
+def _report(shard: int, state: dict) -> ShardReport:
+    return ShardReport(shard, state["pages"], state["rows"], state["errors"], state["seconds"], state["complete"])
+
+
+def _progress(output: str, shards: int) -> Tuple[int, int]:
+    """Return the pages and rows of every shard at their last checkpoint."""
+    pages = rows = 0
+    for shard in range(shards):
+        try:
+            state = _load_checkpoint(output, shard)
+        except (OSError, ValueError):  # being replaced
+            continue
+        pages, rows = pages + state["pages"], rows + state["rows"]
+    return pages, rows
+
+
+def _manifest(output: str, corpus: str, shards: Optional[int], format_: str, workers: int) -> int:
+    """Return the number of shards of the output, a resumed run must keep the same sharding."""
+    path = os.path.join(output, manifest_name)
+    if os.path.exists(path):
+        with open(path, encoding="utf8") as file:
+            manifest = json.load(file)
+        if shards is not None and shards != manifest["shards"] or format_ != manifest["format"] \
+                or os.path.abspath(corpus) != manifest["corpus"]:
+            raise ValueError(f"{output!r} contain a run of an other corpus, shards or format: {manifest}")
+        return manifest["shards"]
+    shards = shards if shards is not None and shards > 0 else workers
+    with open(path, "w", encoding="utf8") as file:
+        json.dump({"corpus": os.path.abspath(corpus), "shards": shards, "format": format_}, file)
+    return shards
+
+
+def _put(pages, process, message) -> None:
+    """Put the message in the queue of the worker, unless the worker is gone."""
+    while True:
+        try:
+            pages.put(message, timeout=1.0)
+            return
+        except queue.Full:
+            if not process.is_alive():
+                raise RuntimeError(f"worker process exited with code {process.exitcode}")
+
+
+def run(
+        rule: Union[str, RulIn],
+        corpus: str,
+        output: str,
+        shards: Optional[int] = None,
+        workers: Optional[int] = None,
+        format_: str = "jsonl",
+        parser: Optional[str] = None,
+        engine: str = "css",
+        checkpoint_every: int = 1000,
+        batch_size: int = 1024,
+        progress: Optional[Callable[[int, int, float], None]] = None,
+        progress_every: float = 10.0
+) -> List[ShardReport]:
+    """
+    Extract every page of the corpus with a pool of processes, resuming a previous run
+    with the same output.
+
+    :param rule: Path of a rule saved by RulIn.save, or a RulIn object.
+    :param corpus: Directory of pages or a tar or zip archive of pages.
+    :param output: Directory of the part files, checkpoints and failures of every shard.
+    :param shards: Number of shards, default to the number of workers. A resumed run use the
+        number of shards of the output.
+    :param workers: Number of worker process, default to the number of CPU, at most the
+        number of shards.
+    :param format_: Format of the part files, "jsonl", "csv" or "parquet" (require pyarrow).
+    :param parser: Name of the beautifulsoup parser, e.g. "lxml".
+    :param engine: Engine of the SimpleExtractor, "css" or "path".
+    :param checkpoint_every: Number of pages of a part file, a checkpoint is saved after it.
+    :param batch_size: Maximum number of items written at a time.
+    :param progress: Called with (pages, rows, seconds) of the run so far (at the last
+        checkpoints) every progress_every seconds.
+
+    :return: The report of every shard.
+
+    :raise ValueError: If the format is unknown, the corpus is not a directory, a tar or a
+        zip archive, the output contain a run of an other corpus, number of shards or format,
+        or the corpus changed since the run was started.
+    :raise FileNotFoundError: If the rule file or the corpus was not found.
+    :raise RuntimeError: If a worker process exited unexpectedly.
+    """
+    if format_ not in sinks:
+        raise ValueError(f"unknown format {format_!r}, expected one of {', '.join(sinks)}")
+    if isinstance(rule, str):  # loaded once, the workers get the RulIn pickled
+        rule = RulIn.load(rule)
+    if not os.path.exists(corpus):
+        raise FileNotFoundError(f"No such corpus: {corpus!r}")
+    kind = corpus_kind(corpus)
+    workers = workers if workers is not None and workers > 0 else os.cpu_count() or 1
+    os.makedirs(output, exist_ok=True)
+    shards = _manifest(output, corpus, shards, format_, workers)
+    states = [_load_checkpoint(output, shard) for shard in range(shards)]
+    if all(state["complete"] for state in states):
+        return [_report(shard, state) for shard, state in enumerate(states)]
+    workers = min(workers, shards)
+
+    started = last_progress = time.perf_counter()
+
+    def report_progress():
+        nonlocal last_progress
+        now = time.perf_counter()
+        if progress is not None and now - last_progress >= progress_every:
+            progress(*_progress(output, shards), now - started)
+            last_progress = now
+
+    context = multiprocessing.get_context()
+    queues = [context.Queue(queue_size) for _ in range(workers)]
+    results = context.Queue()
+    processes = [context.Process(target=_work, daemon=True, args=(
+        queues[worker], results, list(range(worker, shards, workers)), corpus, kind, rule, output, format_,
+        parser, engine, checkpoint_every, batch_size
+    )) for worker in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        position = [0] * shards  # pages of every shard so far
+        for idx, (name, read) in enumerate(iter_corpus(corpus)):
+            shard = idx % shards
+            state, page = states[shard], position[shard]
+            position[shard] += 1
+            if page < state["pages"]:  # done by the previous run
+                if page == state["pages"] - 1 and state.get("last_page") not in (None, name):
+                    raise ValueError(f"{corpus!r} changed since the run in {output!r} was started")
+                continue
+            if state["complete"]:
+                raise ValueError(f"{corpus!r} changed since the run in {output!r} was started")
+            _put(queues[shard % workers], processes[shard % workers], (shard, name, None if read is None else read()))
+            report_progress()
+        if any(page < state["pages"] for page, state in zip(position, states)):
+            raise ValueError(f"{corpus!r} changed since the run in {output!r} was started")
+        for worker in range(workers):
+            _put(queues[worker], processes[worker], None)
+
+        reports = []
+        while len(reports) < shards:
+            try:
+                reports.extend(results.get(timeout=1.0))
+            except queue.Empty:
+                failed = next((process for process in processes if process.exitcode not in (None, 0)), None)
+                if failed is not None:
+                    raise RuntimeError(f"worker process exited with code {failed.exitcode}")
+            report_progress()
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+    if progress is not None:
+        progress(*_progress(output, shards), time.perf_counter() - started)
+    return sorted(reports)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m scraple.runner", description=__doc__.splitlines()[1])
+    parser.add_argument("rule", help="rule file saved by RulIn.save")
+    parser.add_argument("corpus", help="directory of pages, or tar or zip archive of pages")
+    parser.add_argument("output", help="output directory, a previous run in it is resumed")
+    parser.add_argument("--shards", type=int, help="number of shards, default to the number of workers")
+    parser.add_argument("--workers", type=int, help="number of worker process, default to the number of CPU")
+    parser.add_argument("--format", default="jsonl", choices=list(sinks), help="format of the part files")
+    parser.add_argument("--parser", help="beautifulsoup parser, e.g. lxml")
+    parser.add_argument("--engine", default="css", choices=["css", "path"], help="engine of the extractor")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="pages of a part file")
+    args = parser.parse_args(argv)
+
+    def progress(pages, rows, seconds):
+        print(f"{pages} pages, {rows} rows, {pages / seconds if seconds > 0 else 0:.1f} pages/s", file=sys.stderr)
+
+    started = time.perf_counter()
+    try:
+        reports = run(args.rule, args.corpus, args.output, args.shards, args.workers, args.format, args.parser,
+                      args.engine, args.checkpoint_every, progress=progress)
+    except (ValueError, FileNotFoundError) as error:
+        parser.error(str(error))
+    seconds = time.perf_counter() - started
+    print(f"{'shard':>6}{'pages':>12}{'rows':>12}{'pages/s':>10}  errors")
+    for report in reports:
+        errors = ", ".join(f"{name}: {count}" for name, count in sorted(report.errors.items())) or "-"
+        print(f"{report.shard:>6}{report.pages:>12}{report.rows:>12}{report.pages_per_second:>10.1f}  {errors}")
+    pages = sum(report.pages for report in reports)
+    failed = sum(sum(report.errors.values()) for report in reports)
+    print(f"total: {pages} pages, {sum(report.rows for report in reports)} rows, {failed} failed pages, "
+          f"{seconds:.1f}s for this run")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
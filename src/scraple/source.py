@@ -0,0 +1,92 @@
+"""
+Contain the function to read a local page.
+
+The page is read as byte and closed right away, a page compressed with gzip or zstd (e.g.
+an archive of crawled pages) is decompressed whatever the extension of the file. Its encoding
+is taken from the byte order mark or the <meta> charset of the page, utf-8 otherwise. An utf-8
+page is handed to the parser as byte with its encoding so it is decoded only once, by the
+parser; any other encoding is decoded here, as not every parser decode them reliably.
+"""
+import codecs
+import gzip
+import re
+from typing import BinaryIO, Optional, Tuple, Union
+
+gzip_magic = b'\x1f\x8b'
+zstd_magic = b'\x28\xb5\x2f\xfd'
+sniff_size = 4096  # the <meta> charset is searched in the first bytes of the page only
+
+_boms = [  # utf-32 first, its little endian mark start with the utf-16 one
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+_declared_charset = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)|<\?xml[^>]+encoding\s*=\s*["\']([\w.:-]+)', re.I
+)
+
+
+def detect_encoding(data: bytes, default: str = 'utf-8') -> str:
+    for bom, encoding in _boms:
+        if data.startswith(bom):
+            return encoding
+    match = _declared_charset.search(data, 0, sniff_size)
+    if match is None:
+        return default
+    try:
+        encoding = codecs.lookup((match.group(1) or match.group(2)).decode('ascii')).name
+    except LookupError:
+        return default
+    # a page which declare utf-16 without byte order mark is read as ascii, so it is utf-8
+    return default if encoding.startswith(('utf-16', 'utf-32')) else encoding
+
+
+def decompress(data: bytes) -> bytes:
+    if data.startswith(gzip_magic):
+        return gzip.decompress(data)
+    if data.startswith(zstd_magic):
+        try:
+            from compression import zstd  # python 3.14
+            return zstd.decompress(data)
+        except ImportError:
+            import zstandard
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def open_local(path) -> BinaryIO:
+    """Open the file for reading in binary mode, decompressing it if it is compressed."""
+    with open(path, 'rb') as file:
+        magic = file.read(len(zstd_magic))
+    if magic.startswith(gzip_magic):
+        return gzip.open(path, 'rb')
+    if magic.startswith(zstd_magic):
+        try:
+            from compression import zstd
+            return zstd.open(path, 'rb')
+        except ImportError:
+            import zstandard
+            return zstandard.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_local(path) -> Tuple[Union[bytes, str], Optional[str]]:
+    """
+    Return the page as byte with its encoding, or as string (encoding None) if the encoding
+    is not utf-8.
+    """
+    with open(path, 'rb') as file:
+        data = decompress(file.read())
+    encoding = detect_encoding(data)
+    if encoding in ('utf-8', 'utf-8-sig'):
+        return _universal_newlines(data, b'\r', b'\n'), encoding
+    return _universal_newlines(data.decode(encoding, errors='replace'), '\r', '\n'), None
+
+
+def _universal_newlines(data, cr, lf):
+    """Translate line endings to line feed, as reading a file in text mode do."""
+    if cr not in data:
+        return data
+    return data.replace(cr + lf, lf).replace(cr, lf)
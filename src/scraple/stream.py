@@ -0,0 +1,150 @@
+"""
+Contain the function to extract item from a page while it is being parsed.
+
+The page is fed to the builtin html.parser chunk by chunk. Every parent element is
+extracted as soon as its closing tag is parsed and then detached from the tree together
+with everything else that is already closed outside of a parent element, so the memory
+used stay bounded by the size of an item instead of the whole page.
+"""
+import codecs
+from io import IncrementalNewlineDecoder
+from typing import Iterable, Iterator, Optional, Union
+
+from bs4 import BeautifulSoup as Bs
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+
+from .error import ExtractError, ParsingError
+from .plan import ExtractPlan, extract_item
+from .source import detect_encoding, open_local
+
+chunk_size = 1 << 16
+
+
+class _StreamSoup(Bs):
+    """BeautifulSoup that report every closed tag which is a parent element or not inside one."""
+    _plan = None
+
+    def pushTag(self, tag):
+        super().pushTag(tag)
+        if self._plan is not None and tag is not self and self._plan.parent.match(tag):
+            self.open_parents.add(id(tag))
+
+    def popTag(self):
+        tag = self.tagStack[-1] if self.tagStack else None
+        current = super().popTag()
+        if self._plan is not None and tag is not None and tag is not self:
+            is_parent = id(tag) in self.open_parents
+            if is_parent:
+                self.open_parents.discard(id(tag))
+            if is_parent or not self.open_parents:
+                self.closed.append((is_parent, tag, not self.open_parents))
+        return current
+
+
+def _new_soup(plan: ExtractPlan) -> _StreamSoup:
+    soup = _StreamSoup("", features="html.parser")
+    soup.reset()
+    soup.builder.initialize_soup(soup)
+    soup.open_parents, soup.closed = set(), []
+    soup._plan = plan
+    return soup
+
+
+def _new_parser(soup: _StreamSoup) -> BeautifulSoupHTMLParser:
+    args, kwargs = getattr(soup.builder, 'parser_args', ([], {}))
+    try:
+        return BeautifulSoupHTMLParser(soup, *args, **kwargs)
+    except TypeError:  # older beautifulsoup set the soup after instantiating the parser
+        parser = BeautifulSoupHTMLParser(*args, **kwargs)
+        parser.soup = soup
+        return parser
+
+
+def _detach(soup: _StreamSoup, element) -> None:
+    last = element._last_descendant() if element.name is not None else element
+    if soup._most_recent_element is last:
+        soup._most_recent_element = element.previous_element
+    element.extract()
+
+
+def _flush(soup: _StreamSoup, iterate_parent_element_instead: bool) -> Iterator:
+    closed, soup.closed = soup.closed, []
+    for is_parent, tag, outside in closed:
+        parent = tag.parent
+        _detach(soup, tag)
+        if outside and parent is not None:
+            for string in [child for child in parent.contents if child.name is None]:
+                _detach(soup, string)
+        if is_parent:
+            yield tag if iterate_parent_element_instead else extract_item(tag, soup._plan.fields)
+
+
+def _chunks(source, flag: str, encoding: Optional[str]) -> Iterator[str]:
+    if flag == 'local':
+        with open_local(source) as file:
+            yield from _decode(iter(lambda: file.read(chunk_size), b''), encoding, newline=True)
+        return
+    if isinstance(source, (str, bytes)):
+        chunks = (source[i:i + chunk_size] for i in range(0, len(source), chunk_size))
+    elif hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunk_size), source.read(0))
+    else:
+        chunks = source
+    yield from _decode(chunks, encoding)
+
+
+def _decode(chunks: Iterable, encoding: Optional[str], newline: bool = False) -> Iterator[str]:
+    """
+    Decode the byte chunks, with the encoding taken from the first one if not provided as
+    source.read_local do. With newline, the line endings are translated as read_local do too.
+    """
+    decoder = None
+    for chunk in chunks:
+        if not isinstance(chunk, bytes):
+            yield chunk
+            continue
+        if decoder is None:
+            if encoding is None:
+                detected = detect_encoding(chunk)
+                errors = 'strict' if detected in ('utf-8', 'utf-8-sig') else 'replace'
+                decoder = codecs.getincrementaldecoder(detected)(errors)
+            else:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            if newline:
+                decoder = IncrementalNewlineDecoder(decoder, translate=True)
+        yield decoder.decode(chunk)
+    if decoder is not None:
+        yield decoder.decode(b'', final=True)
+
+
+def stream_items(
+        source: Union[str, bytes, Iterable],
+        flag: str,
+        plan: ExtractPlan,
+        iterate_parent_element_instead: bool = False,
+        encoding: Optional[str] = None
+) -> Iterator:
+    flag = flag.lower()
+    if flag not in ('local', 'html'):
+        raise ParsingError(flag)
+
+    soup = _new_soup(plan)
+    parser = _new_parser(soup)
+    found = False
+    try:
+        for chunk in _chunks(source, flag, encoding):
+            parser.feed(chunk)
+            for item in _flush(soup, iterate_parent_element_instead):
+                found = True
+                yield item
+        parser.close()
+        soup.endData()
+        while soup.currentTag is not None and soup.currentTag is not soup:
+            soup.popTag()
+    except (AssertionError, UnicodeDecodeError):
+        raise ParsingError(flag)
+    for item in _flush(soup, iterate_parent_element_instead):
+        found = True
+        yield item
+    if not found:
+        raise ExtractError()
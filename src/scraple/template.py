@@ -0,0 +1,142 @@
+"""
+Contain the template cache of SimpleExtractor, reusing the matches of a page for the pages
+built from the same template (e.g. page 1 to 5000 of a listing).
+
+The fingerprint of a page is a hash of its skeleton, the tag and classes of every element in
+document order with the depth, and the id of the elements which id is used by a selector of
+the plan, so pages which only differ by their text, links or other ids have the same
+fingerprint. For the first page of a fingerprint the parent and field elements are
+matched as usual and their position in the skeleton is kept as the template. For the next
+pages the elements at those positions are taken instead of matching the selectors again,
+every parent element is still checked against the parent selector and the page is matched
+as usual if one does not match.
+
+The selectors are expected to depend only on the tag, classes and id of the elements as the
+one made by Rules do, a selector on other attributes or on the text can match different
+elements on pages with the same skeleton.
+
+A TemplateCache can be shared by extractions running in several threads, the templates and
+counters are only changed under a lock.
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from threading import Lock
+from typing import FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .plan import ExtractPlan, find_items, select_items
+
+_selector_id = re.compile(r'#([\w-]+)')
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class Template(NamedTuple):
+    parents: Tuple[int, ...]  # position of every parent element in the skeleton
+    fields: Tuple[Tuple[Tuple[int, ...], ...], ...]  # position of the elements of every field of every parent
+
+
+class TemplateCache:
+    """
+    Least recently used cache of the templates of the pages, keyed by the fingerprint of
+    the page and the extract plan, so a cache can be shared by several extractors.
+    """
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = max(1, maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()  # (plan, fingerprint) : Template
+        self._lock = Lock()
+
+    def __reduce__(self):  # the templates refer to the plans of this process, a pickled cache start empty
+        return type(self), (self.maxsize,)
+
+    def resolve(self, body, plan: ExtractPlan) -> Tuple[list, list]:
+        """
+        Return the parent elements of the page and the elements of every field of every
+        parent (as extract_items selected parameter), replayed from the template of the
+        page if cached.
+        """
+        fingerprint, elements = skeleton(body, plan_ids(plan))
+        key = plan, fingerprint
+        with self._lock:
+            template = self._templates.get(key)
+        if template is not None:
+            resolved = replay(template, elements, plan)
+            if resolved is not None:
+                with self._lock:
+                    self.hits += 1
+                    if key in self._templates:
+                        self._templates.move_to_end(key)
+                return resolved
+        parents, selected = find_items(body, plan)
+        selected = select_items(parents, plan.fields) if selected is None else selected
+        template = record(elements, parents, selected)
+        with self._lock:
+            self.misses += 1
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        return parents, selected
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._templates))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self.hits = self.misses = 0
+
+
+def plan_ids(plan: ExtractPlan) -> FrozenSet[str]:
+    """Return the ids used by the selectors of the plan."""
+    patterns = [plan.parent.pattern] + [field.selector.pattern for field in plan.fields if field.selector is not None]
+    return frozenset(id_ for pattern in patterns for id_ in _selector_id.findall(pattern))
+
+
+def skeleton(body, ids: FrozenSet[str] = frozenset()) -> Tuple[bytes, list]:
+    """
+    Return the fingerprint of the page and its elements in document order.
+
+    :param ids: The ids kept in the skeleton, every other id is left out.
+    """
+    elements, parts = [], []
+    stack = [iter(body.contents)]
+    while stack:
+        for child in stack[-1]:
+            if child.name is not None:
+                elements.append(child)
+                classes = child.attrs.get('class')
+                part = child.name if not classes else child.name + '.' + '.'.join(classes)
+                if ids and child.attrs.get('id') in ids:
+                    part += '#' + child.attrs['id']
+                parts.append(part)
+                stack.append(iter(child.contents))
+                break
+        else:
+            stack.pop()
+            parts.append('/')  # end of an element, so the depth is part of the skeleton
+    return hashlib.blake2b(' '.join(parts).encode('utf8'), digest_size=16).digest(), elements
+
+
+def record(elements: list, parents: list, selected: list) -> Template:
+    position = {id(element): idx for idx, element in enumerate(elements)}
+    return Template(
+        tuple(position[id(parent)] for parent in parents),
+        tuple(tuple(tuple(position[id(child)] for child in children) for children in field) for field in selected)
+    )
+
+
+def replay(template: Template, elements: list, plan: ExtractPlan) -> Optional[Tuple[list, List[list]]]:
+    """Return the elements at the positions of the template, None if a parent does not match."""
+    parents = [elements[idx] for idx in template.parents]
+    if not all(map(plan.parent.match, parents)):
+        return None
+    return parents, [[[elements[idx] for idx in children] for children in field] for field in template.fields]
@@ -0,0 +1,10 @@
+import pytest
+
+from scraple import Rules
+
+from .pages import quote_rules
+
+
+@pytest.fixture(scope="session")
+def rules() -> Rules:
+    return quote_rules()
@@ -0,0 +1,36 @@
+"""Pages and rules shared by the tests."""
+import os
+
+from scraple import Rules
+
+example_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "doc", "code_example")
+quotes_page = os.path.join(example_dir, "Modified quotes to scrape.html")
+
+
+def quote_rules(parser=None) -> Rules:
+    """The rules of the quotes of the bundled page, a field for every builtin pipeline."""
+    rules = Rules(quotes_page, "local", parser=parser)
+    rules.add_field_rule("Einstein", "Author", pipeline="text")
+    rules.add_field_rule("change", "Tags", find_string_of_nth=2, pipeline="tags")
+    rules.add_field_rule("(about)", "About", pipeline="link")
+    rules.add_field_rule("It cannot be changed", "Quote", pipeline="text")
+    return rules
+
+
+def listing_page(count: int, page: int = 0) -> str:
+    """A page of count items, a title, a link and tags in every item."""
+    items = "".join(
+        f'<div class="item"><h2 class="title">Title {page}-{i}</h2>'
+        f'<a class="link" href="/item/{page}/{i}">more</a>'
+        f'<ul class="tags"><li>tag{i % 3}</li><li>tag{i % 5}</li></ul></div>'
+        for i in range(count)
+    )
+    return f'<html><body><div class="list">{items}</div></body></html>'
+
+
+def listing_rules(**kwargs) -> Rules:
+    rules = Rules(listing_page(4), "html", minimal_selector=True, **kwargs)
+    rules.add_field_rule("Title 0-2", "Title", pipeline="text")
+    rules.add_field_rule("more", "Link", find_string_of_nth=3, pipeline="link")
+    rules.add_field_rule("tag2", "Tags", pipeline="tags")
+    return rules
@@ -0,0 +1,88 @@
+import copy
+import pickle
+
+import pytest
+
+from scraple import SimpleExtractor
+from scraple.metrics import Metrics
+from scraple.template import TemplateCache
+
+from .pages import listing_page, listing_rules
+
+rounds = 2
+pages = [listing_page(8 + page % 7, page) for page in range(48)]  # 7 different templates
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return listing_rules()
+
+
+@pytest.fixture(scope="module")
+def expected(rules):
+    extract = SimpleExtractor(rules)
+    return [list(extract.perform_extraction(page, "html")) for page in pages]
+
+
+@pytest.mark.parametrize("ordered", [True, False], ids=["ordered", "unordered"])
+@pytest.mark.parametrize("threads", [1, 4, 16])
+def test_concurrent_extraction_is_deterministic(rules, expected, threads, ordered):
+    extract = SimpleExtractor(rules)
+    for _ in range(rounds):
+        results = list(extract.perform_extraction_concurrent(pages, "html", threads=threads, ordered=ordered))
+        indexes = [index for index, _ in results]
+        if ordered:
+            assert indexes == list(range(len(pages)))
+        else:
+            assert sorted(indexes) == list(range(len(pages)))
+        assert [items for _, items in sorted(results, key=lambda result: result[0])] == expected
+
+
+@pytest.mark.parametrize("threads", [1, 4, 16])
+def test_shared_metrics_and_template_cache_counters_add_up(rules, expected, threads):
+    metrics, cache = Metrics(), TemplateCache()
+    extract = SimpleExtractor(rules, metrics=metrics, template_cache=cache)
+    for _ in range(rounds):
+        results = dict(extract.perform_extraction_concurrent(pages, "html", threads=threads, ordered=False))
+        assert [results[index] for index in range(len(pages))] == expected
+
+    extracted = rounds * len(pages)
+    items = rounds * sum(map(len, expected))
+    assert metrics.pages == extracted
+    assert metrics.items == items
+    assert metrics.stages["parse"].calls == extracted
+    assert metrics.stages["template"].calls == extracted
+    assert metrics.fields["Title"].matches == items
+    assert metrics.fields["Link"].matches == items
+    assert metrics.fields["Tags"].matches == 2 * items
+
+    info = cache.cache_info()
+    assert info.hits + info.misses == extracted
+    assert info.currsize == 7
+    assert 7 <= info.misses <= 7 * threads  # threads may miss the same template at the same time
+
+
+def test_shared_template_cache_between_extractors(rules, expected):
+    cache = TemplateCache()
+    extractors = [SimpleExtractor(rules, template_cache=cache) for _ in range(4)]
+    for extract in extractors:
+        results = dict(extract.perform_extraction_concurrent(pages, "html", threads=8, ordered=False))
+        assert [results[index] for index in range(len(pages))] == expected
+    assert cache.cache_info().hits + cache.cache_info().misses == 4 * len(pages)
+    assert cache.cache_info().currsize == 7
+
+
+@pytest.mark.parametrize("engine", ["css", "path"])
+def test_extractor_is_copied_and_pickled(rules, expected, engine):
+    cache = TemplateCache(16)
+    extract = SimpleExtractor(rules, parser="html.parser", engine=engine, template_cache=cache)
+    clones = [pickle.loads(pickle.dumps(extract)), copy.copy(extract), copy.deepcopy(extract)]
+    for clone in clones:
+        assert (clone.parser, clone.engine, clone.parent, dict(clone.fields), clone.metrics) == \
+               (extract.parser, engine, extract.parent, dict(extract.fields), None)
+        assert clone._plan.parent_path == extract._plan.parent_path
+        assert [field.path for field in clone._plan.fields] == [field.path for field in extract._plan.fields]
+        assert clone.template_cache.maxsize == 16
+        assert [list(clone.perform_extraction(page, "html")) for page in pages] == expected
+    assert clones[1].template_cache is cache
+    assert clones[0].template_cache is not cache
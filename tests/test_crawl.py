@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+import pytest
+
+from scraple import Rules, SimpleExtractor
+from scraple.crawl import UrllibTransport
+
+from .pages import listing_page, listing_rules
+
+page_count = 5
+
+
+def pager_page(page: int) -> str:
+    """A listing page with a link to the next page, the last one link back to the first."""
+    next_ = page + 1 if page + 1 < page_count else 0
+    pager = f'<nav class="pager"><a class="prev" href="/">Home</a><a class="next" href="page{next_}.html">Next</a></nav>'
+    return listing_page(6, page).replace("</body>", pager + "</body>")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    root = tmp_path_factory.mktemp("site")
+    for page in range(page_count):
+        (root / f"page{page}.html").write_text(pager_page(page), encoding="utf8")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def crawl(extract, *args, **kwargs) -> dict:
+    async def collect():
+        return {url: items async for url, items in extract.crawl(*args, **kwargs)}
+    return asyncio.run(collect())
+
+
+@pytest.fixture(scope="module")
+def extract():
+    return SimpleExtractor(listing_rules())
+
+
+def expected_items(extract, page: int) -> list:
+    return list(extract.perform_extraction(pager_page(page), "html"))
+
+
+def test_crawl_follow_the_pager_once(server, extract):
+    results = crawl(extract, [server + "page0.html"], follow="nav.pager a.next", concurrency=4)
+    assert sorted(results) == sorted(f"{server}page{page}.html" for page in range(page_count))
+    for page in range(page_count):
+        assert results[f"{server}page{page}.html"] == expected_items(extract, page)
+
+
+def test_crawl_follow_a_rules(server, extract):
+    follow = Rules(pager_page(0), "html")
+    follow.add_field_rule("Next", "next")
+    results = crawl(extract, [server + "page2.html"], follow=follow, concurrency=2)
+    assert len(results) == page_count
+
+
+def test_crawl_max_pages_and_transport(server, extract):
+    transport = UrllibTransport(2)
+    try:
+        results = crawl(extract, [server + "page0.html"], follow="nav.pager a.next", transport=transport, max_pages=3)
+    finally:
+        asyncio.run(transport.close())
+    assert len(results) == 3
+    assert all(items == expected_items(extract, int(url[-6])) for url, items in results.items())
+
+
+def test_crawl_without_follow(server, extract):
+    urls = [f"{server}page{page}.html" for page in (1, 3)]
+    results = crawl(extract, urls)
+    assert sorted(results) == urls
+
+
+def test_crawl_missing_page(server, extract):
+    urls = [server + "missing.html", server + "page0.html"]
+    results = crawl(extract, urls, follow="nav.pager a.next", concurrency=4, on_error="yield")
+    assert len(results) == page_count + 1
+    assert isinstance(results.pop(server + "missing.html"), HTTPError)
+    assert all(items == expected_items(extract, int(url[-6])) for url, items in results.items())
+
+    results = crawl(extract, urls, follow="nav.pager a.next", concurrency=4, on_error="skip")
+    assert sorted(results) == sorted(f"{server}page{page}.html" for page in range(page_count))
+    with pytest.raises(HTTPError):
+        crawl(extract, urls, follow="nav.pager a.next")
+    with pytest.raises(ValueError):
+        crawl(extract, urls, on_error="ignore")
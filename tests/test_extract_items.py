@@ -0,0 +1,55 @@
+import pytest
+from bs4 import BeautifulSoup as Bs
+
+from scraple import SimpleExtractor
+from scraple.metrics import Metrics
+from scraple.plan import extract_item, extract_items, item_chunk_size
+
+from .pages import listing_page, listing_rules
+
+count = item_chunk_size * 2 + 10
+
+
+def fail_on_last(elements):
+    if elements[0].text == f"Title 0-{count - 1}":
+        raise ValueError("last item")
+    return elements[0].text
+
+
+@pytest.fixture(scope="module")
+def page():
+    return Bs(listing_page(count), "html.parser")
+
+
+@pytest.mark.parametrize("pipelines", [True, False])
+def test_chunks_give_the_same_items_as_item_by_item(page, pipelines):
+    rules = listing_rules()
+    if not pipelines:
+        rules.add_field_rule("Title 0-2", "Raw")
+    extract = SimpleExtractor(rules)
+    parents = list(extract.perform_extraction(page, "parsed", True))
+    expected = [extract_item(parent, extract._plan.fields) for parent in parents]
+    assert len(expected) == count
+    assert list(extract_items(parents, extract._plan.fields)) == expected
+    assert list(extract_items(parents, extract._plan.fields, chunk_size=7)) == expected
+    assert list(extract.perform_extraction(page, "parsed")) == expected
+
+
+def test_first_item_is_yielded_before_the_last_is_extracted(page):
+    rules = listing_rules()
+    rules.add_field_rule("Title 0-2", "Checked", pipeline=fail_on_last)
+    for extract in (SimpleExtractor(rules), SimpleExtractor(rules, metrics=Metrics())):
+        items = extract.perform_extraction(page, "parsed")
+        assert next(items)["Checked"] == "Title 0-0"
+        with pytest.raises(ValueError):
+            list(items)
+
+
+def test_no_batch_pipeline_is_extracted_item_by_item(page):
+    rules = listing_rules()
+    rules.add_field_rule("Title 0-2", "Checked", pipeline=fail_on_last)
+    extract = SimpleExtractor(rules)
+    parents = list(extract.perform_extraction(page, "parsed", True))
+    fields = tuple(field for field in extract._plan.fields if field.batch is None)
+    items = extract_items(parents, fields, chunk_size=len(parents))
+    assert next(items) == {"Checked": "Title 0-0"}
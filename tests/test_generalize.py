@@ -0,0 +1,67 @@
+import pytest
+
+from scraple import Rules, SimpleExtractor
+
+
+def item(page: int, index: int) -> str:
+    """An item with a class and id of its own, and a class on every other item."""
+    featured = " featured" if index % 2 else ""
+    return (f'<div class="quote{featured} q-{page}-{index}" id="quote-{page}-{index}">'
+            f'<span class="text">Text {page}-{index}</span>'
+            f'<small class="author a{page}{index}">Author {page}-{index}</small></div>')
+
+
+def page(number: int, count: int = 4) -> str:
+    """A page with a class and id of its own, and a span.text outside of the items."""
+    items = "".join(item(number, index) for index in range(count))
+    return (f'<html><body><div class="header"><span class="text">Header {number}</span></div>'
+            f'<div class="list page-{number}" id="list-{number}">{items}</div></body></html>')
+
+
+def add_fields(rules: Rules) -> Rules:
+    rules.add_field_rule("Text 1-2", "Text", pipeline="text")
+    rules.add_field_rule("Author 1-2", "Author", pipeline="text")
+    return rules
+
+
+def expected(number: int, count: int) -> list:
+    return [{"Text": f"Text {number}-{index}", "Author": f"Author {number}-{index}"} for index in range(count)]
+
+
+@pytest.mark.parametrize("engine", ["css", "path"])
+def test_generalized_rule_extract_every_page(engine):
+    rules = add_fields(Rules([page(1), page(2), page(3)], "html"))
+    extract = SimpleExtractor(rules, engine=engine)
+    for number, count in ((1, 4), (2, 6), (3, 1), (7, 9)):
+        assert list(extract.perform_extraction(page(number, count), "html")) == expected(number, count)
+
+
+def test_generalized_selectors_keep_the_stable_tokens_only():
+    rule = add_fields(Rules([page(1), page(2), page(3)], "html")).get_extract_rule()
+    selectors = [rule.parent] + [selector for selector, _ in rule.fields.values()]
+    assert selectors == [".quote", " .text", " .author"]  # a class is preferred to the bare tag
+    assert not any(character.isdigit() for selector in selectors for character in selector)  # no class of a page or item
+    assert rule.parent_path is None  # the parent lost tokens, its path would not match the other pages
+    assert dict(rule.field_paths) == {"Text": ("span.text",)}
+
+
+def test_field_is_generalized_within_the_parents():
+    rules = add_fields(Rules([page(1), page(2)], "html"))
+    assert rules.get_extract_rule().fields["Text"][0] == " .text"  # the span.text of the header is not below a parent
+    assert "Header 1" not in [item_["Text"] for item_ in SimpleExtractor(rules).perform_extraction(page(1), "html")]
+
+
+def test_repeated_ids_are_dropped():
+    items = "".join(f'<div class="quote" id="quote-{index}"><span class="text">Text 1-{index}</span>'
+                    f'<small class="author">Author 1-{index}</small></div>' for index in range(4))
+    html = f'<html><body><div class="list" id="list">{items}</div></body></html>'
+    rules = add_fields(Rules(html, "html", minimal_selector=True))
+    assert rules.get_extract_rule().parent == ".quote"  # the id of an item is not kept
+    assert list(SimpleExtractor(rules).perform_extraction(html.replace("quote-", "other-"), "html")) == expected(1, 4)
+
+
+def test_single_reference_keep_the_whole_selectors():
+    rule = add_fields(Rules(page(1), "html")).get_extract_rule()
+    assert rule.parent == "div.list.page-1#list-1 div.quote.q-1-2#quote-1-2"
+    assert dict((key, selector) for key, (selector, _) in rule.fields.items()) == \
+           {"Text": " span.text", "Author": " small.author.a12"}
@@ -0,0 +1,69 @@
+import pytest
+
+from scraple import ExtractorGroup, Rules, RulIn, SimpleExtractor
+from scraple.error import ExtractError
+from scraple.metrics import Metrics
+from scraple.pipeline import text
+
+from .pages import listing_page, listing_rules, quote_rules, quotes_page
+
+
+def pager_rules() -> Rules:
+    rules = Rules(quotes_page, "local")
+    rules.add_field_rule("Next", "Pager", pipeline="link")
+    return rules
+
+
+def tag_rules() -> Rules:
+    rules = Rules(listing_page(4), "html")
+    rules.add_field_rule("tag2", "Tag", pipeline="text")
+    return rules
+
+
+def extract(group, html, flag, iterate_parent_element_instead=False) -> dict:
+    results = group.perform_extraction(html, flag, iterate_parent_element_instead)
+    return {name: list(items) for name, items in results.items()}
+
+
+def test_group_give_the_same_items_as_every_extractor():
+    rules = {"quotes": quote_rules(), "pager": pager_rules()}
+    expected = {name: list(SimpleExtractor(rule).perform_extraction(quotes_page, "local")) for name, rule in rules.items()}
+    assert extract(ExtractorGroup(rules), quotes_page, "local") == expected
+
+    second = RulIn(["div.item", {"Second tag": (" ul.tags li:nth-child(2)", text), "Item": ("", None)}])
+    rules = {"items": listing_rules(), "tags": tag_rules(), "second": second}
+    html = listing_page(40)
+    expected = {name: list(SimpleExtractor(rule).perform_extraction(html, "html")) for name, rule in rules.items()}
+    assert [len(expected[name]) for name in rules] == [40, 80, 40]
+    assert extract(ExtractorGroup(rules), html, "html") == expected
+    expected = {name: list(SimpleExtractor(rule).perform_extraction(html, "html", True)) for name, rule in rules.items()}
+    assert extract(ExtractorGroup(rules), html, "html", True) == expected
+
+
+def test_group_nested_parents():
+    rules = {"items": listing_rules(), "tags": tag_rules()}
+    inner = listing_page(2, 9).split('<div class="list">')[1].split("</div></body>")[0]
+    html = listing_page(3).replace('<ul class="tags">', inner + '<ul class="tags">', 1)
+    expected = {name: list(SimpleExtractor(rule).perform_extraction(html, "html")) for name, rule in rules.items()}
+    assert len(expected["items"]) == 5
+    assert extract(ExtractorGroup(rules), html, "html") == expected
+
+
+def test_group_rule_without_match():
+    results = ExtractorGroup({"items": listing_rules(), "pager": pager_rules()}).perform_extraction(listing_page(3), "html")
+    assert len(list(results["items"])) == 3
+    with pytest.raises(ExtractError):
+        list(results["pager"])
+
+
+def test_group_metrics():
+    group_metrics, extractor_metrics = Metrics(), Metrics()
+    extractor = SimpleExtractor(tag_rules(), metrics=extractor_metrics, engine="path")
+    group = ExtractorGroup({"items": listing_rules(), "tags": extractor}, metrics=group_metrics)
+    assert group.extractors["tags"] is extractor
+    extract(group, listing_page(10), "html")
+
+    assert (group_metrics.pages, group_metrics.items, extractor_metrics.pages, extractor_metrics.items) == (1, 10, 0, 20)
+    assert group_metrics.stages["parse"].calls == group_metrics.stages["parent_select"].calls == 1
+    assert group_metrics.fields["Title"].matches == 10
+    assert extractor_metrics.fields["Tag"].matches == 20
@@ -0,0 +1,87 @@
+import pytest
+
+from scraple import SimpleExtractor
+from scraple.incremental import StateStore
+
+from .pages import listing_rules
+
+calls = []
+
+
+def counted_title(elements):
+    """Pipeline recording every item it is run for."""
+    calls.append(elements[0].text)
+    return elements[0].text
+
+
+def page(*items) -> str:
+    """A listing page of the items (title, link)."""
+    return '<html><body><div class="list">' + "".join(
+        f'<div class="item"><h2 class="title">{title}</h2><a class="link" href="{link}">more</a>'
+        f'<ul class="tags"><li>tag</li></ul></div>' for title, link in items
+    ) + '</div></body></html>'
+
+
+@pytest.fixture()
+def extract():
+    rules = listing_rules()
+    rules.add_field_rule("Title 0-2", "Counted", pipeline=counted_title)
+    calls.clear()
+    return SimpleExtractor(rules)
+
+
+def changes(extract, store, html, key_field=None) -> list:
+    return [(change.status, change.item["Title"])
+            for change in extract.perform_incremental_extraction(html, "html", store, "page", key_field)]
+
+
+first = page(("A", "/a"), ("B", "/b"), ("C", "/c"))
+second = page(("A", "/a"), ("B2", "/b"), ("D", "/d"))  # B changed, C removed, D added
+
+
+def test_changes_by_key_field(extract):
+    with StateStore(":memory:") as store:
+        assert changes(extract, store, first, "Link") == [("added", "A"), ("added", "B"), ("added", "C")]
+        assert changes(extract, store, first, "Link") == []
+        calls.clear()
+        assert changes(extract, store, second, "Link") == [("changed", "B2"), ("added", "D"), ("removed", "C")]
+        assert calls == ["B2", "D"]  # the pipelines only run for the fresh items
+        assert changes(extract, store, second, "Link") == []
+
+
+def test_changes_by_html(extract):
+    with StateStore(":memory:") as store:
+        changes(extract, store, first)
+        calls.clear()
+        assert sorted(changes(extract, store, second)) == \
+               [("added", "B2"), ("added", "D"), ("removed", "B"), ("removed", "C")]
+        assert calls == ["B2", "D"]
+        change = next(change for change in extract.perform_incremental_extraction(first, "html", store, "page")
+                      if change.status == "removed")
+        assert change.item == {"Title": "B2", "Link": "/b", "Tags": ["tag"], "Counted": "B2"}  # the stored item
+
+
+def test_duplicate_keys_keep_the_first(extract):
+    with StateStore(":memory:") as store:
+        assert changes(extract, store, page(("A", "/a"), ("A bis", "/a")), "Link") == [("added", "A")]
+        assert changes(extract, store, page(("A", "/a"), ("A ter", "/a")), "Link") == []
+        assert changes(extract, store, page(("A2", "/a"), ("A", "/a")), "Link") == [("changed", "A2")]
+
+
+def test_state_is_kept_in_the_file(extract, tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    with StateStore(path) as store:
+        changes(extract, store, first, "Link")
+        assert changes(extract, store, first, "Link") == []
+    with StateStore(path) as store:
+        assert sorted(store.load("page")) == ["/a", "/b", "/c"]
+        assert changes(extract, store, second, "Link") == [("changed", "B2"), ("added", "D"), ("removed", "C")]
+        assert store.load("other") == {}
+
+
+def test_incremental_arguments(extract):
+    with StateStore(":memory:") as store:
+        with pytest.raises(ValueError):
+            list(extract.perform_incremental_extraction(first, "html", store))
+        with pytest.raises(KeyError):
+            list(extract.perform_incremental_extraction(first, "html", store, "page", "Missing"))
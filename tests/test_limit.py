@@ -0,0 +1,44 @@
+import pytest
+
+from scraple import SimpleExtractor
+from scraple.error import ExtractError
+from scraple.template import TemplateCache
+
+from .pages import listing_page, listing_rules
+
+count = 7
+html = listing_page(count)
+empty_page = "<html><body><p>nothing</p></body></html>"
+
+
+@pytest.fixture(scope="module", params=["css", "path", "template"])
+def extract(request):
+    if request.param == "template":
+        return SimpleExtractor(listing_rules(), template_cache=TemplateCache())
+    return SimpleExtractor(listing_rules(), engine=request.param)
+
+
+@pytest.fixture(scope="module")
+def expected(extract):
+    items = list(extract.perform_extraction(html, "html"))
+    assert len(items) == count
+    return items
+
+
+@pytest.mark.parametrize("offset", [-1, 0, 1, 3, count - 1, count, count + 2])
+@pytest.mark.parametrize("limit", [None, -1, 0, 1, 2, count, count + 5])
+def test_limit_and_offset_slice_the_items(extract, expected, limit, offset):
+    stop = None if limit is None else max(0, offset) + limit
+    sliced = [] if limit is not None and limit < 1 else expected[max(0, offset):stop]
+    assert list(extract.perform_extraction(html, "html", limit=limit, offset=offset)) == sliced
+    parents = list(extract.perform_extraction(html, "html", True))
+    assert list(extract.perform_extraction(html, "html", True, limit=limit, offset=offset)) == \
+           ([] if limit is not None and limit < 1 else parents[max(0, offset):stop])
+
+
+def test_first(extract, expected):
+    assert extract.first(html, "html") == expected[0]
+    with pytest.raises(ExtractError):
+        extract.first(empty_page, "html")
+    with pytest.raises(ExtractError):
+        list(extract.perform_extraction(empty_page, "html", limit=3))
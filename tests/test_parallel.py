@@ -0,0 +1,17 @@
+from scraple import SimpleExtractor
+from scraple.parallel import plain_item
+
+from .pages import listing_page, listing_rules
+
+empty_page = "<html><body><p>nothing</p></body></html>"
+
+
+def test_extract_many_page_without_item():
+    extract = SimpleExtractor(listing_rules())
+    pages = [listing_page(5, page) if page != 3 else empty_page for page in range(8)]
+    expected = [[plain_item(item) for item in extract.perform_extraction(page, "html")] if page != empty_page else []
+                for page in pages]
+    for ordered in (True, False):
+        results = list(extract.extract_many(pages, "html", workers=2, chunksize=3, ordered=ordered))
+        assert sorted(index for index, _ in results) == list(range(len(pages)))
+        assert [items for _, items in sorted(results, key=lambda result: result[0])] == expected
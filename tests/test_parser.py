@@ -0,0 +1,69 @@
+import pytest
+from bs4 import BeautifulSoup as Bs
+from bs4.builder import builder_registry
+
+from scraple import SimpleExtractor
+from scraple.extract import default_parser, resolve_parser
+
+from .pages import quote_rules, quotes_page
+
+needs_lxml = pytest.mark.skipif(builder_registry.lookup("lxml") is None, reason="lxml is not installed")
+
+
+@needs_lxml
+def test_parsers_extract_the_same_items(rules):
+    extract = SimpleExtractor(rules)
+    expected = list(extract.perform_extraction(quotes_page, "local", parser="html.parser"))
+    assert len(expected) == 4
+    assert expected[0] == {
+        "Author": "Albert Einstein",
+        "Tags": ["change", "deep-thoughts", "thinking", "world"],
+        "About": "https://quotes.toscrape.com/author/Albert-Einstein",
+        "Quote": expected[0]["Quote"],
+    }
+    assert expected[0]["Quote"].startswith("“The world as we have created it")
+    assert list(extract.perform_extraction(quotes_page, "local", parser="lxml")) == expected
+    assert list(SimpleExtractor(rules, parser="lxml").perform_extraction(quotes_page, "local")) == expected
+
+
+@needs_lxml
+def test_rules_made_with_lxml_extract_the_same_items(rules):
+    expected = list(SimpleExtractor(rules).perform_extraction(quotes_page, "local"))
+    lxml_rules = quote_rules("lxml")
+    assert SimpleExtractor(lxml_rules).parser == "lxml"
+    for parser in ("lxml", "html.parser"):
+        assert list(SimpleExtractor(lxml_rules, parser).perform_extraction(quotes_page, "local")) == expected
+
+
+@needs_lxml
+def test_parsed_page_give_the_same_items(rules):
+    extract = SimpleExtractor(rules)
+    expected = list(extract.perform_extraction(quotes_page, "local"))
+    with open(quotes_page, "rb") as file:
+        soup = Bs(file.read(), "lxml")
+    assert list(extract.perform_extraction(soup, "parsed")) == expected
+
+
+def test_uninstalled_parser_fall_back_to_html_parser(rules):
+    assert resolve_parser("no-such-parser") == default_parser == "html.parser"
+    assert resolve_parser(["no-such-parser", "html.parser"]) == "html.parser"
+    assert resolve_parser(None) == "html.parser"
+
+    extract = SimpleExtractor(rules, parser="no-such-parser")
+    assert extract.parser == "html.parser"
+    expected = list(SimpleExtractor(rules).perform_extraction(quotes_page, "local"))
+    assert list(extract.perform_extraction(quotes_page, "local")) == expected
+    assert list(extract.perform_extraction(quotes_page, "local", parser="no-such-parser")) == expected
+    assert quote_rules("no-such-parser")._parser == "html.parser"
+
+
+@needs_lxml
+def test_preferred_parsers_skip_the_uninstalled_ones(rules, monkeypatch):
+    assert resolve_parser(["no-such-parser", "lxml"]) == "lxml"
+    expected = list(SimpleExtractor(rules).perform_extraction(quotes_page, "local"))
+
+    lookup = builder_registry.lookup
+    monkeypatch.setattr(builder_registry, "lookup", lambda *features: None if "lxml" in features else lookup(*features))
+    extract = SimpleExtractor(rules, parser=["lxml"])  # as if lxml was not installed
+    assert extract.parser == "html.parser"
+    assert list(extract.perform_extraction(quotes_page, "local")) == expected
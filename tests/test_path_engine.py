@@ -0,0 +1,88 @@
+import pytest
+from bs4 import BeautifulSoup as Bs
+
+from scraple import Rules, SimpleExtractor
+from scraple.plan import _last_compound, find_items, select_items
+from scraple.template import TemplateCache
+
+from .pages import listing_page, listing_rules, quote_rules, quotes_page
+
+
+def item(name: str) -> str:
+    return f'<div class="item"><h2 class="title">{name}</h2><a class="link" href="/{name}">more</a></div>'
+
+
+def page(*items: str) -> str:
+    return f'<html><body><div class="list">{"".join(items)}</div></body></html>'
+
+
+@pytest.fixture(scope="module")
+def rules():
+    rules = Rules(page(*map(item, "WXYZ")), "html")
+    rules.add_field_rule("Y", "Title", pipeline="text")
+    rules.add_field_rule("more", "Link", find_string_of_nth=3, pipeline="link")
+    return rules
+
+
+def titles(extract, html):
+    return [dictionary["Title"] for dictionary in extract.perform_extraction(html, "html")]
+
+
+def test_parent_at_another_depth_is_not_dropped(rules):
+    html = page(item("A"), '<div class="ad">' + item("C") + '</div>', item("D"))
+    assert titles(SimpleExtractor(rules), html) == ["A", "C", "D"]
+    assert titles(SimpleExtractor(rules, engine="path"), html) == ["A", "C", "D"]
+
+
+def test_field_at_another_depth_is_not_dropped(rules):
+    html = page(item("A"), item("B").replace('<h2 class="title">B</h2>', '<div><h2 class="title">B</h2></div>'))
+    expected = list(SimpleExtractor(rules).perform_extraction(html, "html"))
+    assert [dictionary["Title"] for dictionary in expected] == ["A", "B"]
+    assert list(SimpleExtractor(rules, engine="path").perform_extraction(html, "html")) == expected
+
+
+def filler(count: int) -> str:
+    return "".join(f'<div class="filler"><h2>{index}</h2><span>{index}</span></div>' for index in range(count))
+
+
+def test_every_field_is_checked_in_one_walk(rules):
+    wrapped = item("B").replace('<h2 class="title">B</h2>', '<div><h2 class="title">B</h2></div>')
+    nested = item("C").replace("</div>", item("N") + "</div>")
+    html = page(*(item(name).replace("</div>", filler(20) + "</div>") for name in "AD"), wrapped, nested, item("E"))
+    css, path = SimpleExtractor(rules), SimpleExtractor(rules, engine="path")
+    expected = list(css.perform_extraction(html, "html"))
+    assert [dictionary["Title"] for dictionary in expected] == ["A", "D", "B", "C N", "N", "E"]
+    assert list(path.perform_extraction(html, "html")) == expected
+    assert list(SimpleExtractor(rules, engine="path", template_cache=TemplateCache()).perform_extraction(html, "html")) \
+           == expected
+    assert list(path.perform_batch_extraction(html, "html")) == list(css.perform_batch_extraction(html, "html"))
+
+    parents, selected = find_items(Bs(html.replace(item("N"), ""), "html.parser").body, path._plan)
+    assert selected is not None  # the parents are at the path, so the fields were checked with them
+    assert selected == select_items(parents, path._plan.fields) == select_items(parents, css._plan.fields)
+    assert find_items(Bs(html, "html.parser").body, path._plan)[1] is None  # the nested item is not at the path
+
+
+def test_path_engine_give_the_same_items_as_css():
+    rules = listing_rules()
+    html = listing_page(300)
+    expected = list(SimpleExtractor(rules).perform_extraction(html, "html"))
+    assert len(expected) == 300
+    assert list(SimpleExtractor(rules, engine="path").perform_extraction(html, "html")) == expected
+    rules = quote_rules()
+    expected = list(SimpleExtractor(rules).perform_extraction(quotes_page, "local"))
+    assert list(SimpleExtractor(rules, engine="path").perform_extraction(quotes_page, "local")) == expected
+
+
+@pytest.mark.parametrize("pattern, compound", [
+    ("div.container div.quote", ("div", frozenset({"quote"}), None)),
+    (" span small.author", ("small", frozenset({"author"}), None)),
+    (".item", (None, frozenset({"item"}), None)),
+    ("div > span#price", ("span", frozenset(), "price")),
+    ("div.a.b#c", ("div", frozenset({"a", "b"}), "c")),
+    ("a:not(.x)", None),
+    ("a, b", None),
+    ("p[title]", None),
+])
+def test_last_compound(pattern, compound):
+    assert _last_compound(pattern) == compound
@@ -0,0 +1,66 @@
+import pytest
+
+from scraple import Rules, RulIn, SimpleExtractor
+from scraple.error import SearchError
+
+from .pages import quotes_page
+
+
+def upper_text(elements):
+    return elements[0].text.upper()
+
+
+def test_saved_rule_is_loaded_back(tmp_path, rules):
+    rule = rules.get_extract_rule()
+    path = str(tmp_path / "rule.json")
+    rule.save(path)
+    loaded = RulIn.load(path)
+    assert (loaded.parent, dict(loaded.fields), loaded.parent_path, dict(loaded.field_paths)) == \
+           (rule.parent, dict(rule.fields), rule.parent_path, dict(rule.field_paths))
+    assert list(SimpleExtractor(loaded).perform_extraction(quotes_page, "local")) == \
+           list(SimpleExtractor(rule).perform_extraction(quotes_page, "local"))
+
+
+def test_pipeline_is_saved_by_name(tmp_path):
+    rules = Rules(quotes_page, "local")
+    rules.add_field_rule("Einstein", "Author", pipeline=upper_text)
+    path = str(tmp_path / "rule.json")
+    rules.get_extract_rule().save(path)
+    assert RulIn.load(path).fields["Author"][1] is upper_text
+
+    rules.add_field_rule("(about)", "About", pipeline=lambda elements: elements)
+    with pytest.raises(ValueError):
+        rules.get_extract_rule().save(path)
+
+
+def test_cached_rule_does_not_parse_the_reference(tmp_path, rules):
+    expected = rules.get_extract_rule()
+    for _ in range(2):
+        cached = Rules(quotes_page, "local", cache_dir=str(tmp_path))
+        cached.add_field_rule("Einstein", "Author", pipeline="text")
+        cached.add_field_rule("change", "Tags", find_string_of_nth=2, pipeline="tags")
+        cached.add_field_rule("(about)", "About", pipeline="link")
+        cached.add_field_rule("It cannot be changed", "Quote", pipeline="text")
+        rule = cached.get_extract_rule()
+        assert (rule.parent, dict(rule.fields)) == (expected.parent, dict(expected.fields))
+    assert cached._reference is None  # the second one was loaded from the cache
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_failed_call_is_dropped_with_cache(tmp_path):
+    rules = Rules(quotes_page, "local", cache_dir=str(tmp_path))
+    rules.add_field_rule("Einstein", "Author", pipeline="text")
+    rules.add_field_rules([("(about)", "About", False, 0, 1, "link"), ("zzz", "Missing")])
+    with pytest.raises(SearchError):
+        rules.get_extract_rule()
+    assert list(rules.get_extract_rule().fields) == ["Author"]  # none of the rules of the failed call is added
+
+    with pytest.raises(SearchError):  # the reference is loaded now, the string is searched at once
+        rules.add_field_rule("zzz", "Missing")
+    rules.add_field_rule("(about)", "About", pipeline="link")
+    assert list(rules.get_extract_rule().fields) == ["Author", "About"]
+
+    plain = Rules(quotes_page, "local")
+    plain.add_field_rule("Einstein", "Author", pipeline="text")
+    plain.add_field_rule("(about)", "About", pipeline="link")
+    assert dict(rules.get_extract_rule().fields) == dict(plain.get_extract_rule().fields)
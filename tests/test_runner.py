@@ -0,0 +1,186 @@
+import glob
+import gzip
+import json
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from scraple import SimpleExtractor
+from scraple.runner import main, run
+
+from .pages import listing_page, listing_rules
+
+page_count = 23
+bad_page = 7  # no item, ExtractError
+crash_marker = "SCRAPLE_TEST_CRASH"
+
+
+def crash_once(elements):
+    """Pipeline killing its worker process on the item "Title 12-0" while the marker file exist."""
+    text = elements[0].text
+    marker = os.environ.get(crash_marker)
+    if text == "Title 12-0" and marker and os.path.exists(marker):
+        os.remove(marker)
+        os._exit(3)
+    return text
+
+
+def fail_late(elements):
+    """Pipeline failing on the item "Title 0-1500", after the first batch of the page."""
+    text = elements[0].text
+    if text == "Title 0-1500":
+        raise ValueError(text)
+    return text
+
+
+def page_html(page: int) -> str:
+    return "<html><body><p>nothing</p></body></html>" if page == bad_page else listing_page(5, page)
+
+
+@pytest.fixture()
+def corpus(tmp_path):
+    root = tmp_path / "corpus"
+    (root / "sub").mkdir(parents=True)
+    for page in range(page_count):
+        path = (root / "sub" if page % 3 == 0 else root) / f"page{page:03d}.html"
+        if page == 11:
+            path.with_suffix(".html.gz").write_bytes(gzip.compress(page_html(page).encode("utf8")))
+        else:
+            path.write_text(page_html(page), encoding="utf8")
+    return root
+
+
+@pytest.fixture()
+def rule(tmp_path):
+    rules = listing_rules()
+    rules.add_field_rule("Title 0-2", "Check", pipeline=crash_once)
+    path = str(tmp_path / "rule.json")
+    rules.get_extract_rule().save(path)
+    return path
+
+
+def expected_rows(rule) -> list:
+    from scraple import RulIn
+    extract = SimpleExtractor(RulIn.load(rule))
+    return sorted(json.dumps(item, sort_keys=True) for page in range(page_count) if page != bad_page
+                  for item in extract.perform_extraction(page_html(page), "html"))
+
+
+def output_rows(output) -> list:
+    rows = []
+    for path in glob.glob(os.path.join(output, "shard-*-part-*.jsonl")):
+        with open(path, encoding="utf8") as file:
+            rows.extend(json.dumps(json.loads(line), sort_keys=True) for line in file)
+    return sorted(rows)
+
+
+def archive(corpus, path, format_):
+    if format_ == "tar":
+        with tarfile.open(path, "w:gz") as file:
+            file.add(corpus, arcname="corpus")
+    else:
+        with zipfile.ZipFile(path, "w") as file:
+            for root, _, names in os.walk(corpus):
+                for name in names:
+                    file.write(os.path.join(root, name), os.path.relpath(os.path.join(root, name), corpus))
+    return str(path)
+
+
+@pytest.mark.parametrize("format_", ["directory", "tar", "zip"])
+def test_run_extract_every_page_once(tmp_path, corpus, rule, format_):
+    source = str(corpus) if format_ == "directory" else archive(corpus, tmp_path / f"corpus.{format_}", format_)
+    output = str(tmp_path / "output")
+    reports = run(rule, source, output, shards=3, workers=2, checkpoint_every=2)
+
+    assert [report.shard for report in reports] == [0, 1, 2]
+    assert all(report.complete for report in reports)
+    assert sum(report.pages for report in reports) == page_count
+    assert sum(report.rows for report in reports) == 5 * (page_count - 1)
+    assert [report.errors for report in reports].count({"ExtractError": 1}) == 1
+    assert output_rows(output) == expected_rows(rule)
+    failures = [json.loads(line) for path in glob.glob(os.path.join(output, "*.failures.jsonl"))
+                for line in open(path, encoding="utf8")]
+    assert [(os.path.basename(failure["page"]), failure["error"]) for failure in failures] == \
+           [(f"page{bad_page:03d}.html", "ExtractError")]
+
+    assert run(rule, source, output) == reports  # complete, nothing is extracted again
+
+
+def checkpoint(output, shard: int) -> dict:
+    path = os.path.join(output, f"shard-{shard:05d}.checkpoint.json")
+    if not os.path.exists(path):
+        return {"complete": False}
+    with open(path, encoding="utf8") as file:
+        return json.load(file)
+
+
+def test_run_resume_after_a_crash(tmp_path, corpus, rule, monkeypatch):
+    output = str(tmp_path / "output")
+    marker = tmp_path / "crash"
+    marker.touch()
+    monkeypatch.setenv(crash_marker, str(marker))
+    with pytest.raises(RuntimeError):
+        run(rule, str(corpus), output, shards=3, workers=3, checkpoint_every=2)
+    assert not marker.exists()
+    assert not all(checkpoint(output, shard)["complete"] for shard in range(3))
+
+    reports = run(rule, str(corpus), output, workers=2, checkpoint_every=2)
+    assert sum(report.pages for report in reports) == page_count
+    assert output_rows(output) == expected_rows(rule)
+
+
+def test_resume_check_the_corpus(tmp_path, corpus, rule):
+    output = str(tmp_path / "output")
+    run(rule, str(corpus), output, shards=2, workers=2, checkpoint_every=1)
+    with pytest.raises(ValueError):
+        run(rule, str(corpus), output, shards=3)
+    with pytest.raises(ValueError):
+        run(rule, str(corpus), output, format_="csv")
+
+    for shard in range(2):  # as if the run stopped right after the last checkpoints
+        state = checkpoint(output, shard)
+        state["complete"] = False
+        with open(os.path.join(output, f"shard-{shard:05d}.checkpoint.json"), "w", encoding="utf8") as file:
+            json.dump(state, file)
+    os.remove(corpus / checkpoint(output, 0)["last_page"])
+    with pytest.raises(ValueError):
+        run(rule, str(corpus), output)
+
+
+def test_page_failing_mid_page_write_nothing(tmp_path):
+    rules = listing_rules()
+    rules.add_field_rule("Title 0-2", "Check", pipeline=fail_late)
+    rule = str(tmp_path / "rule.json")
+    rules.get_extract_rule().save(rule)
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "big.html").write_text(listing_page(2000, 0), encoding="utf8")
+    (corpus / "small.html").write_text(listing_page(5, 1), encoding="utf8")
+
+    output = str(tmp_path / "output")
+    reports = run(rule, str(corpus), output, shards=1, workers=1)
+    assert (reports[0].pages, reports[0].rows, reports[0].errors) == (2, 5, {"ValueError": 1})
+    assert len(output_rows(output)) == 5
+
+
+def test_run_reject_other_corpus(tmp_path, rule):
+    with pytest.raises(FileNotFoundError):
+        run(rule, str(tmp_path / "missing"), str(tmp_path / "output"))
+    (tmp_path / "page.html").write_text(page_html(0), encoding="utf8")
+    with pytest.raises(ValueError):
+        run(rule, str(tmp_path / "page.html"), str(tmp_path / "output"))
+    assert not (tmp_path / "output").exists()
+
+
+def test_main(tmp_path, corpus, rule, capsys):
+    output = str(tmp_path / "output")
+    assert main([rule, str(corpus), output, "--workers", "2", "--shards", "2", "--checkpoint-every", "4"]) == 0
+    out = capsys.readouterr().out
+    assert "ExtractError: 1" in out
+    assert f"total: {page_count} pages, {5 * (page_count - 1)} rows, 1 failed pages" in out
+    assert output_rows(output) == expected_rows(rule)
+    with pytest.raises(SystemExit):
+        main([rule, str(corpus), output, "--shards", "3"])
+    assert "contain a run of an other corpus" in capsys.readouterr().err
@@ -0,0 +1,110 @@
+import re
+
+import pytest
+
+from scraple import Rules, SearchError
+from scraple.Tree_search_engine import find_identity_by_string
+from scraple.TreeCore import create_Tree
+from scraple.extract import refine_body
+
+from .pages import listing_page, quotes_page
+
+mixed_page = (
+    '<html><head><title>abc</title></head><body>'
+    '<p>ab<b>c</b>d e</p><script>var e = "abc d";</script><style>.e {color: red}</style>'
+    '<!-- abc --><div>a<span>b</span>c<span> d</span><p>ab</p><p>abc</p></div>'
+    '<ul><li>e</li><li>ab c</li><li><b>a</b>bc</li></ul></body></html>'
+)
+
+
+def reference_search(body, string, nth, climb, regex=False):
+    """The search as it was first written: the n-th lowest element which text contain the string."""
+    found = []
+
+    def walk(element, identity):
+        below = False
+        for position, child in enumerate(element.find_all(True, recursive=False), 1):
+            child_identity = identity + (position,)
+            if walk(child, child_identity):
+                below = True
+            elif (re.search(string, child.text) if regex else string in child.text):
+                found.append(child_identity)
+                below = True
+        return below
+
+    walk(body, ())
+    if len(found) < max(nth, 1):
+        return None
+    identity = found[max(nth, 1) - 1]
+    return identity[:-climb] if climb > 0 else identity
+
+
+def strings_of(body) -> list:
+    text = body.text
+    words = sorted(set(text.split()))[:40]
+    return words + [text[i:i + 3] for i in range(0, len(text) - 3, max(1, len(text) // 30))] + ["e", " ", "\n", ""]
+
+
+@pytest.mark.parametrize("page, flag", [(quotes_page, "local"), (listing_page(12), "html"), (mixed_page, "html")])
+def test_literal_search_give_the_same_element_as_before(page, flag):
+    body = refine_body(page, flag)
+    tree = create_Tree(body)
+    cache = {}
+    for string in strings_of(body):
+        for nth in range(0, 5):
+            for climb in range(0, 3):
+                expected = reference_search(body, string, nth, climb)
+                if expected is None:
+                    with pytest.raises(SearchError):
+                        find_identity_by_string(tree, string, nth, climb, cache=cache)
+                else:
+                    assert find_identity_by_string(tree, string, nth, climb, cache=cache) == expected, \
+                        (string, nth, climb)
+
+
+def test_add_field_rules_add_nothing_if_a_string_is_missing():
+    rules = Rules(mixed_page, "html")
+    rules.add_field_rule("ab c", "First")
+    before = rules.get_extract_rule()
+    with pytest.raises(SearchError):
+        rules.add_field_rules([("abc", "Second"), {"string": "missing", "field_name": "Third"}, ("e", "Fourth")])
+    after = rules.get_extract_rule()
+    assert (after.parent, dict(after.fields)) == (before.parent, dict(before.fields))
+
+    rules.add_field_rules([("abc", "Second"), ("e", "Fourth")])
+    assert list(rules.get_extract_rule().fields) == ["First", "Second", "Fourth"]
+
+
+@pytest.mark.parametrize("pattern, flags", [
+    (r"a\s?b", 0), (r"^ab", 0), (r"c$", 0), (r"AB\s?C", re.IGNORECASE), (r"^E$", re.I | re.M), (r"d\b", 0),
+])
+def test_compiled_pattern_and_re_flag(pattern, flags):
+    body = refine_body(mixed_page, "html")
+    tree = create_Tree(body)
+    compiled = re.compile(pattern, flags)
+    for nth in range(1, 5):
+        expected = reference_search(body, compiled, nth, 0, regex=True)
+        found = []
+        for string, regex in [(compiled, False), (compiled, True), (pattern, flags or True)]:
+            try:  # a compiled pattern is always searched as regex, an int re_flag is used to compile it
+                found.append(find_identity_by_string(tree, string, nth, 0, regex=regex))
+            except SearchError:
+                found.append(None)
+        assert found == [expected] * 3, nth
+    if flags:
+        with pytest.raises(SearchError):
+            find_identity_by_string(tree, pattern, 1, 0, regex=True)
+
+
+def test_rules_with_compiled_pattern_and_re_flag():
+    rules = Rules(mixed_page, "html")
+    rules.add_field_rule(re.compile("^AB C$", re.I), "Compiled")
+    rules.add_field_rule("^A$", "Flag", re_flag=re.IGNORECASE, climb=1)
+    fields = rules.get_extract_rule().fields
+    expected = Rules(mixed_page, "html")
+    expected.add_field_rule("^ab c$", "Compiled", re_flag=True)
+    expected.add_field_rule("^a$", "Flag", re_flag=True, climb=1)
+    assert {name: selector for name, (selector, _) in fields.items()} == \
+           {name: selector for name, (selector, _) in expected.get_extract_rule().fields.items()}
+    with pytest.raises(SearchError):
+        rules.add_field_rule("^A$", "Case", re_flag=True)
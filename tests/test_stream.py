@@ -0,0 +1,50 @@
+import codecs
+import gzip
+
+import pytest
+
+from scraple import SimpleExtractor
+from scraple.error import ParsingError
+
+from .pages import listing_page, listing_rules
+
+
+def accented_page(charset: str = "") -> str:
+    head = f'<head><meta charset="{charset}"></head>' if charset else ""
+    return listing_page(40).replace("<body>", head + "<body>").replace("Title", "Café Ÿ").replace("</h2>", "</h2>\r\n")
+
+
+@pytest.fixture(scope="module")
+def extract():
+    return SimpleExtractor(listing_rules())
+
+
+@pytest.mark.parametrize("charset, data", [
+    ("windows-1252", lambda html: html.encode("windows-1252")),
+    ("", lambda html: codecs.BOM_UTF16_LE + html.encode("utf-16-le")),
+    ("", lambda html: codecs.BOM_UTF8 + html.encode("utf-8")),
+    ("utf-8", lambda html: gzip.compress(html.encode("utf-8"))),
+    ("windows-1252", lambda html: gzip.compress(html.encode("windows-1252"))),
+], ids=["windows-1252", "utf-16", "utf-8-bom", "gzip", "gzip-windows-1252"])
+def test_streaming_decode_local_page_as_perform_extraction(extract, tmp_path, charset, data):
+    path = tmp_path / "page.html"
+    path.write_bytes(data(accented_page(charset)))
+    expected = list(extract.perform_extraction(str(path), "local"))
+    assert expected[3]["Title"] == "Café Ÿ 0-3"
+    assert list(extract.perform_streaming_extraction(str(path), "local")) == expected
+
+
+def test_streaming_detect_encoding_of_html_byte(extract):
+    html = accented_page("windows-1252")
+    expected = list(extract.perform_extraction(html, "html"))
+    assert list(extract.perform_streaming_extraction(html.encode("windows-1252"), "html")) == expected
+    assert list(extract.perform_streaming_extraction(html.encode("utf-8"), "html", encoding="utf-8")) == expected
+
+
+def test_undecodable_page_raise_parsing_error(extract, tmp_path):
+    path = tmp_path / "page.html"
+    path.write_bytes(accented_page().encode("windows-1252"))  # no charset, so read as utf-8
+    with pytest.raises(ParsingError):
+        list(extract.perform_streaming_extraction(str(path), "local"))
+    with pytest.raises(ParsingError):
+        list(extract.perform_streaming_extraction(str(path), "local", encoding="ascii"))
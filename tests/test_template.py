@@ -0,0 +1,34 @@
+from scraple import Rules, SimpleExtractor
+from scraple.template import TemplateCache
+
+from .pages import listing_page, listing_rules
+
+
+def product_page(first: str, second: str) -> str:
+    return ('<html><body><div class="product">'
+            f'<span id="{first}">10</span><span id="{second}">A</span>'
+            '</div></body></html>')
+
+
+def test_pages_of_the_same_template_are_replayed():
+    rules = listing_rules()
+    cache = TemplateCache()
+    cached, plain = SimpleExtractor(rules, template_cache=cache), SimpleExtractor(rules)
+    for page in range(5):
+        html = listing_page(30, page)
+        assert list(cached.perform_extraction(html, "html")) == list(plain.perform_extraction(html, "html"))
+    assert cache.cache_info() == (4, 1, 128, 1)
+
+
+def test_swapped_ids_are_not_replayed():
+    rules = Rules(product_page("price", "name"), "html")
+    rules.add_field_rule("10", "price", pipeline="text")
+    rules.add_field_rule("A", "name", pipeline="text")
+    assert "#price" in rules.get_extract_rule().fields["price"][0]
+
+    cache = TemplateCache()
+    cached, plain = SimpleExtractor(rules, template_cache=cache), SimpleExtractor(rules)
+    for html in (product_page("price", "name"), product_page("name", "price")):
+        assert list(cached.perform_extraction(html, "html")) == list(plain.perform_extraction(html, "html"))
+    assert list(cached.perform_extraction(product_page("name", "price"), "html")) == [{"price": "A", "name": "10"}]
+    assert cache.cache_info() == (1, 2, 128, 2)